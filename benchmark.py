@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import contextlib
+import graph
+import graph_store
+import instrumentation
+import synthetic_data
+
+# Papers generated per benchmark scale
+SCALES = [50000, 200000, 1000000]
+BENCH_DIR = "benchmark_data"
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+# Slowdown or memory growth over the baseline reported as a regression
+TOLERANCE = 0.25
+# Runs faster than this are too noisy to compare
+MIN_SECONDS = 0.5
+
+
+def _store(work):
+    return graph_store.load_graph(os.path.join(work, graph_store.STORE_PATH))
+
+
+def stage_build(data, work):
+    import title_index
+    G = graph.build_citation_graph(data, graph.MIN_CITATIONS, graph.START_YEAR, graph.END_YEAR)
+    path = os.path.join(work, graph_store.STORE_PATH)
+    graph_store.save_graph(G, path)
+    title_index.build_index(graph_store.CSRGraph(path))
+    return {"nodes": G.number_of_nodes(), "edges": G.number_of_edges()}
+
+
+def stage_statistics(data, work):
+    import graph_stats
+    G = _store(work)
+    # time the computation, not the cache
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(os.path.join(G.store.path, graph_stats.STATS_FILE))
+    graph.report_statistics(G)
+
+
+def stage_topic_pagerank(data, work):
+    import topic_pagerank
+    topic_pagerank.compute_topic_sensitive_pagerank(_store(work), topic_pagerank.TOPICS)
+
+
+def stage_pagerank_sweep(data, work):
+    import ex_3
+    ex_3.analyze_pagerank_correlations(os.path.join(work, graph_store.STORE_PATH), k=50)
+
+
+def stage_co_citation(data, work):
+    import ex_2
+    ex_2.compute_co_citation(_store(work))
+
+
+def stage_coupling(data, work):
+    import ex_2
+    ex_2.compute_bibliographic_coupling(_store(work))
+
+
+def stage_layout(data, work):
+    import visualise
+    cache = os.path.join(work, visualise.POS_CACHE)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(cache)
+    visualise.load_or_compute_pos(_store(work), cache=cache)
+
+
+# In run order; every stage after build reads the store build wrote
+STAGES = {
+    "build_citation_graph": stage_build,
+    "report_statistics": stage_statistics,
+    "topic_pagerank": stage_topic_pagerank,
+    "pagerank_sweep": stage_pagerank_sweep,
+    "co_citation": stage_co_citation,
+    "bibliographic_coupling": stage_coupling,
+    "layout": stage_layout,
+}
+
+
+def run_stage(name, data, work):
+    """Runs one stage in this process and returns its time, peak memory and extra results."""
+    os.chdir(work)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        extra = STAGES[name](data, work) or {}
+        seconds = time.perf_counter() - start
+    return dict(seconds=seconds, peak_rss_mb=instrumentation.peak_rss_mb(), **extra)
+
+
+def run_scale(num_papers, stages, bench_dir=BENCH_DIR):
+    """
+    Generates (or reuses) synthetic data with num_papers papers and runs every
+    stage in a fresh interpreter, so peak memory is measured per stage.
+    """
+    root = os.path.abspath(os.path.join(bench_dir, str(num_papers)))
+    data = os.path.join(root, "dblp-ref")
+    work = os.path.join(root, "work")
+    if not os.path.exists(os.path.join(data, f"dblp-ref-{synthetic_data.NUM_FILES - 1}.json")):
+        print(f"Generating {num_papers:,} synthetic papers in {data}")
+        synthetic_data.generate(data, num_papers)
+    shutil.rmtree(work, ignore_errors=True)
+    os.makedirs(work)
+    results = {}
+    for name in stages:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--stage", name, "--data", data,
+                              "--work", work], capture_output=True, text=True)
+        if out.returncode != 0:
+            print(out.stderr)
+            raise RuntimeError(f"Stage {name} failed at {num_papers:,} papers")
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{num_papers:>10,} {name:<24} {results[name]['seconds']:>9.2f}s {results[name]['peak_rss_mb']:>9.1f} MB")
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Prints the change against the baseline per scale and stage; returns the regressions found."""
+    regressions = []
+    print(f"\n{'Papers':>10} {'Stage':<24} {'Time':>16} {'Peak memory':>18}")
+    for scale, stages in results["scales"].items():
+        for name, now in stages.items():
+            before = baseline.get("scales", {}).get(scale, {}).get(name)
+            if before is None:
+                continue
+            time_ratio = now["seconds"] / max(before["seconds"], 1e-9)
+            memory_ratio = now["peak_rss_mb"] / max(before["peak_rss_mb"], 1e-9)
+            flags = []
+            if time_ratio > 1 + tolerance and now["seconds"] >= MIN_SECONDS:
+                flags.append("time")
+            if memory_ratio > 1 + tolerance:
+                flags.append("memory")
+            if flags:
+                regressions.append((scale, name, flags))
+            print(f"{int(scale):>10,} {name:<24} {time_ratio:>15.2f}x {memory_ratio:>17.2f}x"
+                  f"{'  REGRESSION (' + ', '.join(flags) + ')' if flags else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark on synthetic DBLP-like data")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="papers generated per scale")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", nargs="?", const=BASELINE_FILE, help="compare against this baseline")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_FILE, help="also store the results as baseline")
+    parser.add_argument("--stage", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    parser.add_argument("--work", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        # child process for one stage
+        print(json.dumps(run_stage(args.stage, args.data, args.work)))
+        return
+
+    stages = [name for name in STAGES if name in args.stages]
+    if "build_citation_graph" not in stages:
+        # the other stages need the store
+        stages.insert(0, "build_citation_graph")
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scales": {},
+    }
+    print(f"{'Papers':>10} {'Stage':<24} {'Time':>10} {'Peak memory':>12}")
+    for num_papers in args.scales:
+        results["scales"][str(num_papers)] = run_scale(num_papers, stages)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved at {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved at {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {TOLERANCE:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import graph
+import graph_store
+import instrumentation
+from concurrent.futures import ProcessPoolExecutor
+
+# The whole corpus, converted once, lives in this directory
+COLUMNS_PATH = "dblp_columns"
+FORMAT_VERSION = 1
+
+
+def scan_columns(json_file, start, end):
+    """
+    Decodes every line that begins inside the byte range [start, end) of
+    json_file. Returns the number of lines seen, the papers as (id, title,
+    year, n_citation, references) tuples and the local indices of the
+    malformed lines, all in file order. Papers without an id are skipped.
+    """
+    line_count = 0
+    papers = []
+    malformed = []
+    with graph.open_data_file(json_file) as f:
+        if start > 0:
+            # skip the line that started in the previous range
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell() if start > 0 else 0
+        while position < end or json_file.endswith(graph.COMPRESSED):
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            line_count += 1
+            if not line.strip():
+                continue
+            try:
+                paper = json.loads(line)
+            except json.JSONDecodeError:
+                malformed.append(line_count)
+                continue
+            if paper.get("id"):
+                papers.append((paper["id"], paper.get("title"), paper.get("year") or 0,
+                               paper.get("n_citation") or 0, paper.get("references", [])))
+    return line_count, papers, malformed
+
+
+def _file_signature(paths):
+    return [{"name": os.path.basename(p), "size": os.path.getsize(p), "mtime": os.path.getmtime(p)} for p in paths]
+
+
+def convert(data_directory, path=COLUMNS_PATH, pattern=None, workers=None):
+    """
+    One pass over the raw files into columnar arrays: ids and titles as string
+    tables, year and n_citation as integer columns and the references as a CSR
+    over paper indices (references to papers outside the corpus are dropped).
+    A paper id seen twice keeps its first occurrence. Returns the paper count.
+    """
+    # graph imports this module, so its defaults are looked up at call time
+    pattern = pattern or graph.DATA_GLOB
+    files = graph.data_files(data_directory, pattern)
+    if not files:
+        raise FileNotFoundError(f"No data files matching '{os.path.join(data_directory, pattern)}'")
+    if os.path.exists(os.path.join(path, "meta.json")):
+        with open(os.path.join(path, "meta.json")) as f:
+            graph.warn_changed_files([entry["name"] for entry in json.load(f)["files"]], files)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # every id seen, as paper or as reference, gets a symbol; papers map symbols to rows
+    symbols = {}
+    paper_of_symbol = []
+    ids, titles, years, citations = [], [], [], []
+    ref_counts, ref_symbols = [], []
+    total_lines = 0
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        tasks = [(json_file, start, end) for json_file in files for start, end in graph.file_chunks(json_file)]
+        results = executor.map(scan_columns, *zip(*tasks)) if executor else (scan_columns(*t) for t in tasks)
+        for (json_file, _, _), (line_count, papers, malformed) in zip(tasks, results):
+            for local_line in malformed:
+                print(f"Warning: Skipping malformed JSON line {total_lines + local_line}")
+            total_lines += line_count
+            with instrumentation.span("columns.chunk", file=os.path.basename(json_file)):
+                for paper_id, title, year, n_citation, references in papers:
+                    symbol = symbols.setdefault(paper_id, len(symbols))
+                    if symbol >= len(paper_of_symbol):
+                        paper_of_symbol.extend([-1] * (symbol + 1 - len(paper_of_symbol)))
+                    if paper_of_symbol[symbol] >= 0:
+                        continue
+                    paper_of_symbol[symbol] = len(ids)
+                    ids.append(paper_id)
+                    titles.append(title)
+                    years.append(year)
+                    citations.append(n_citation)
+                    ref_counts.append(len(references))
+                    ref_symbols.extend(symbols.setdefault(r, len(symbols)) for r in references)
+                instrumentation.count("columns.lines", line_count)
+                instrumentation.count("columns.papers", len(papers))
+            print(f"Converted {total_lines:,} lines, {len(ids):,} papers so far")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    # symbols of references to papers never seen map to -1 and are dropped
+    paper_of_symbol = np.array(paper_of_symbol + [-1] * (len(symbols) - len(paper_of_symbol)), dtype=np.int64)
+    targets = paper_of_symbol[np.array(ref_symbols, dtype=np.int64)]
+    counts = np.array(ref_counts, dtype=np.int64)
+    rows = np.repeat(np.arange(len(ids)), counts)
+    known = targets >= 0
+    ref_indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    ref_indptr[1:] = np.cumsum(np.bincount(rows[known], minlength=len(ids)))
+
+    os.makedirs(path, exist_ok=True)
+    graph_store.save_strings(path, "ids", ids)
+    graph_store.save_strings(path, "titles", [t if t is not None else "" for t in titles])
+    np.save(os.path.join(path, "title_mask.npy"), np.array([t is not None for t in titles], dtype=bool))
+    np.save(os.path.join(path, "year.npy"), np.array(years, dtype=np.int32))
+    np.save(os.path.join(path, "n_citation.npy"), np.array(citations, dtype=np.int64))
+    np.save(os.path.join(path, "ref_indptr.npy"), ref_indptr)
+    np.save(os.path.join(path, "ref_indices.npy"), targets[known].astype(np.int32))
+    meta = {"format": FORMAT_VERSION, "num_papers": len(ids), "num_references": int(known.sum()),
+            "lines": total_lines, "files": _file_signature(files)}
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    print(f"Columns saved at {path}: {len(ids):,} papers, {int(known.sum()):,} references")
+    return len(ids)
+
+
+class Columns:
+    """
+    The converted corpus, memory-mapped. Any filtered citation graph is derived
+    from it with array masks instead of a rescan of the raw files.
+    """
+
+    def __init__(self, path=COLUMNS_PATH):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.num_papers = self.meta["num_papers"]
+        self.ids = graph_store.StringTable(path, "ids")
+        self.titles = graph_store.StringTable(path, "titles")
+        self.title_mask = np.load(os.path.join(path, "title_mask.npy"), mmap_mode="r")
+        self.year = np.load(os.path.join(path, "year.npy"), mmap_mode="r")
+        self.n_citation = np.load(os.path.join(path, "n_citation.npy"), mmap_mode="r")
+        self.ref_indptr = np.load(os.path.join(path, "ref_indptr.npy"), mmap_mode="r")
+        self.ref_indices = np.load(os.path.join(path, "ref_indices.npy"), mmap_mode="r")
+
+    def is_current(self, data_directory, pattern=None):
+        """True when the raw files still match the ones converted."""
+        return self.meta["files"] == _file_signature(graph.data_files(data_directory, pattern or graph.DATA_GLOB))
+
+    def title(self, i):
+        return self.titles[i] if self.title_mask[i] else None
+
+    def select(self, min_citations, start_year, end_year):
+        """
+        Papers meeting the criteria, in corpus order, and the citations among
+        them as a CSR (indptr, indices) over their positions in that order.
+        Each row keeps the first occurrence of every target, like the
+        networkx graph build_citation_graph returns.
+        """
+        keep = np.flatnonzero((np.asarray(self.n_citation) >= min_citations)
+                              & (np.asarray(self.year) >= start_year) & (np.asarray(self.year) <= end_year))
+        position = np.full(self.num_papers, -1, dtype=np.int64)
+        position[keep] = np.arange(len(keep))
+        counts = np.diff(self.ref_indptr)[keep]
+        rows = np.repeat(np.arange(len(keep)), counts)
+        targets = position[np.asarray(self.ref_indices)[graph_store.concat_ranges(np.asarray(self.ref_indptr)[keep], counts)]]
+        inside = targets >= 0
+        rows, targets = rows[inside], targets[inside]
+        # drop repeated citations, keeping the first one of each row
+        _, first = np.unique(rows * len(keep) + targets, return_index=True)
+        first.sort()
+        rows, targets = rows[first], targets[first]
+        indptr = np.zeros(len(keep) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(rows, minlength=len(keep)))
+        return keep, indptr, targets.astype(np.int32)
+
+    def write_subgraph(self, store_path, min_citations, start_year, end_year):
+        """
+        Writes the filtered citation graph straight into a graph store. Returns
+        (nodes, edges), or None without writing anything when no paper matches.
+        """
+        keep, indptr, indices = self.select(min_citations, start_year, end_year)
+        if len(keep) == 0:
+            return None
+        ids = [self.ids[i] for i in keep.tolist()]
+        titles = [self.title(i) for i in keep.tolist()]
+        graph_store.write_store(store_path, ids, titles, indptr, indices)
+        return len(keep), len(indices)
+
+
+def main():
+    data_directory = sys.argv[1] if len(sys.argv) > 1 else "./dblp.v10/dblp-ref"
+    start = time.time()
+    convert(data_directory)
+    print(f"Converted in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
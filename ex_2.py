@@ -1,49 +1,189 @@
 import os
-import pickle
-from collections import Counter
-from itertools import combinations
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import graph_store
+import instrumentation
+from pagerank_engine import top_k
 
 
 def load_graph(path):
-    with open(path, "rb") as f:
-        return pickle.load(f)
+    return graph_store.load_graph(path)
 
 
-def top_k_from_counter(counter, k=10):
-    return counter.most_common(k)
+# Approximate bytes used per path of a block (row, shared paper and paired
+# paper as int64, their sorted copies and the sort permutation)
+BYTES_PER_ENTRY = 64
+MEMORY_BUDGET = 256 * 1024 * 1024
 
+_worker_arrays = None
 
-def compute_co_citation(G):
+
+def _id_rank(store):
+    # position of every node when the nodes are sorted by DBLP id
+    id_rank = np.empty(store.num_nodes, dtype=np.int64)
+    id_rank[np.asarray(store.id_order)] = np.arange(store.num_nodes)
+    return id_rank
+
+
+def _init_worker(store_path):
+    global _worker_arrays
+    store = graph_store.CSRGraph(store_path)
+    _worker_arrays = (np.asarray(store.indptr), np.asarray(store.indices),
+                      np.asarray(store.rev_indptr), np.asarray(store.rev_indices), _id_rank(store))
+
+
+def _keep_top(counts, first, rows, cols, k, id_rank):
+    # the k best pairs in the final order: count, first shared paper, then the pair's id order
+    if len(counts) > k:
+        kth = np.partition(counts, len(counts) - k)[len(counts) - k]
+        keep = np.flatnonzero(counts >= kth)
+        best = keep[np.lexsort((id_rank[cols[keep]], id_rank[rows[keep]], first[keep], -counts[keep]))[:k]]
+        counts, first, rows, cols = counts[best], first[best], rows[best], cols[best]
+    return counts, first, rows, cols
+
+
+def _block_paths(first_indptr, first_indices, second_indptr, second_indices, start, stop):
+    # every path row -> shared paper -> paired paper starting in rows [start, stop)
+    via = np.asarray(first_indices[first_indptr[start]:first_indptr[stop]], dtype=np.int64)
+    rows = np.repeat(np.arange(start, stop, dtype=np.int64), np.diff(first_indptr[start:stop + 1]))
+    lengths = second_indptr[via + 1] - second_indptr[via]
+    cols = np.asarray(second_indices[graph_store.concat_ranges(second_indptr[via], lengths)], dtype=np.int64)
+    return np.repeat(rows, lengths), np.repeat(via, lengths), cols
+
+
+def _pair_counts_block(measure, blocks, k):
+    """
+    Running top-k over the row blocks of A^T A (co-citation) or A A^T
+    (coupling), counted from the paths row -> shared paper -> paired paper.
+    Every unordered pair is counted once, in the row of the paper with the
+    smaller DBLP id. Ties are broken by the final order (first shared paper,
+    then the ids of the pair), so no more than k pairs are ever kept.
+    """
+    indptr, indices, rev_indptr, rev_indices, id_rank = _worker_arrays
+    n = len(id_rank)
+    if measure == "co_citation":
+        lists = (rev_indptr, rev_indices, indptr, indices)
+    else:
+        lists = (indptr, indices, rev_indptr, rev_indices)
+    best = tuple(np.zeros(0, dtype=np.int64) for _ in range(4))
+    for start, stop in blocks:
+        rows, via, cols = _block_paths(*lists, start, stop)
+        keep = id_rank[rows] < id_rank[cols]
+        rows, via, cols = rows[keep], via[keep], cols[keep]
+        # paths grouped by pair; the first shared paper is the smallest one on a path
+        pairs = (rows - start) * n + cols
+        order = np.argsort(pairs)
+        pairs, via = pairs[order], via[order]
+        heads = np.flatnonzero(np.diff(pairs, prepend=-1))
+        shared = np.minimum.reduceat(via, heads) if len(heads) else heads
+        pairs = pairs[heads]
+        found = (np.diff(np.append(heads, len(order))), shared, pairs // n + start, pairs % n)
+        best = _keep_top(*(np.concatenate(pair) for pair in zip(best, found)), k, id_rank)
+    return best
+
+
+def _row_blocks(left_indptr, right_degrees, left_indices, budget_entries):
+    # row r of the product touches at most sum(right_degrees[left_indices of r]) entries
+    work = np.add.reduceat(np.append(right_degrees[left_indices], 0), left_indptr[:-1]) \
+        if len(left_indices) else np.zeros(len(left_indptr) - 1, dtype=np.int64)
+    work[np.diff(left_indptr) == 0] = 0
+    blocks = []
+    start = 0
+    total = 0
+    for row, w in enumerate(work.tolist()):
+        if total + w > budget_entries and row > start:
+            blocks.append((start, row))
+            start, total = row, 0
+        total += w
+    blocks.append((start, len(work)))
+    return blocks
+
+
+def top_pairs(G, measure, k=10, workers=None, memory_budget=MEMORY_BUDGET):
+    """
+    Top-k pairs for "co_citation" or "bibliographic_coupling" as
+    [((id a, id b), score), ...], in the same order Counter.most_common gives
+    for the pair-enumeration definition: ties go to the pair first seen when
+    walking the papers in graph order.
+    """
+    store = G.store
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if measure == "co_citation":
+        # pairs of papers cited by the same source
+        left_indptr, left_indices = np.asarray(store.rev_indptr), np.asarray(store.rev_indices)
+        right_degrees = store.out_degrees()
+    elif measure == "bibliographic_coupling":
+        # pairs of papers citing the same target
+        left_indptr, left_indices = np.asarray(store.indptr), np.asarray(store.indices)
+        right_degrees = store.in_degrees()
+    else:
+        raise ValueError(f"Unknown measure '{measure}'")
+
+    budget_entries = max(1, memory_budget // BYTES_PER_ENTRY // max(workers, 1))
+    blocks = _row_blocks(left_indptr, right_degrees, left_indices, budget_entries)
+    # spread the blocks round-robin so every worker gets a mix of heavy and light rows
+    shares = [blocks[i::workers] for i in range(min(workers, len(blocks)))]
+    with instrumentation.span(f"{measure}.pair_counts", blocks=len(blocks), workers=len(shares)):
+        if len(shares) > 1:
+            with ProcessPoolExecutor(max_workers=len(shares), initializer=_init_worker,
+                                     initargs=(store.path,)) as executor:
+                found = list(executor.map(_pair_counts_block, [measure] * len(shares), shares, [k] * len(shares)))
+        else:
+            _init_worker(store.path)
+            found = [_pair_counts_block(measure, shares[0], k)]
+        # at most k per worker, however many pairs tie
+        instrumentation.record(f"{measure}.retained", sum(len(part[0]) for part in found))
+        id_rank = _id_rank(store)
+        counts, first, rows, cols = _keep_top(*(np.concatenate(part) for part in zip(*found)), k, id_rank)
+
+    # order of first appearance: the first shared paper, then the pair's id order
+    order = np.lexsort((id_rank[cols], id_rank[rows], first, -counts))
+    return [((store.node_id(int(rows[i])), store.node_id(int(cols[i]))), int(counts[i])) for i in order]
+
+
+def compute_co_citation(G, k=10, workers=None, memory_budget=MEMORY_BUDGET):
     """
     Co-citation: number of papers that cite both i and j.
-    For each citing paper (source) look at its cited targets and increment counts for each pair.
+    Computed as row blocks of A^T A from the adjacency lists of the store.
     """
-    counts = Counter()
-    # iterate over each paper that cites others
-    for source in G.nodes():
-        # targets that `source` cites: outgoing neighbors
-        targets = list(G.successors(source))
-        if len(targets) < 2:
-            continue
-        # increment for each unordered pair of targets
-        for a, b in combinations(sorted(targets), 2):
-            counts[(a, b)] += 1
-    return counts
-
-
-def compute_bibliographic_coupling(G):
+    return top_pairs(G, "co_citation", k, workers, memory_budget)
+
+
+def compute_bibliographic_coupling(G, k=10, workers=None, memory_budget=MEMORY_BUDGET):
     """
     Bibliographic coupling: number of shared references between i and j.
-    For each cited paper (target), look at its citing sources (predecessors) and increment counts for each pair of sources.
+    Computed as row blocks of A A^T from the adjacency lists of the store.
+    """
+    return top_pairs(G, "bibliographic_coupling", k, workers, memory_budget)
+
+
+def similar_papers(G, paper_id, measure="co_citation", k=10):
+    """
+    Top-k papers paired with one paper by "co_citation" or
+    "bibliographic_coupling" as [(id, score), ...]: one row of A^T A or
+    A A^T, gathered from the neighbours of the paper's neighbours.
     """
-    counts = Counter()
-    for target in G.nodes():
-        sources = list(G.predecessors(target))
-        if len(sources) < 2:
-            continue
-        for a, b in combinations(sorted(sources), 2):
-            counts[(a, b)] += 1
-    return counts
+    store = G.store
+    i = store.index_of(paper_id)
+    if measure == "co_citation":
+        # the papers citing i, then everything they cite
+        first_indptr, first_indices = store.rev_indptr, store.rev_indices
+        second_indptr, second_indices = np.asarray(store.indptr), store.indices
+    elif measure == "bibliographic_coupling":
+        # the papers i cites, then everything citing them
+        first_indptr, first_indices = store.indptr, store.indices
+        second_indptr, second_indices = np.asarray(store.rev_indptr), store.rev_indices
+    else:
+        raise ValueError(f"Unknown measure '{measure}'")
+    neighbours = np.asarray(first_indices[first_indptr[i]:first_indptr[i + 1]], dtype=np.int64)
+    starts = second_indptr[neighbours]
+    reached = np.asarray(second_indices)[graph_store.concat_ranges(starts, second_indptr[neighbours + 1] - starts)]
+    counts = np.bincount(reached, minlength=store.num_nodes)
+    counts[i] = 0
+    nodes = np.flatnonzero(counts)
+    best = nodes[top_k(counts[nodes], k)]
+    return [(store.node_id(int(j)), int(counts[j])) for j in best]
 
 
 def id_to_title(G, node_id):
@@ -61,7 +201,7 @@ def print_top(title, pairs, G):
 
 def main():
     base = os.path.dirname(__file__)
-    gpath = os.path.join(base, "dblp_filtered_graph.gpickle")
+    gpath = os.path.join(base, graph_store.STORE_PATH)
     if not os.path.exists(gpath):
         print("Graph file not found at", gpath)
         return
@@ -74,8 +214,7 @@ def main():
 
     # Compute co-citation
     print("Computing co-citation counts...")
-    cocounts = compute_co_citation(G)
-    top_coc = top_k_from_counter(cocounts, 10)
+    top_coc = compute_co_citation(G, 10)
     # print_top("Top-10 Similar Papers based on Co-citation Score", top_coc, G)
     # save the results to a file
     output_path = os.path.join(base, "results_ex2/top_co_citation.txt")
@@ -90,8 +229,7 @@ def main():
 
     # Compute bibliographic coupling
     print("Computing bibliographic coupling counts...")
-    bibcounts = compute_bibliographic_coupling(G)
-    top_bib = top_k_from_counter(bibcounts, 10)
+    top_bib = compute_bibliographic_coupling(G, 10)
     # print_top("Top-10 Similar Papers based on Bibliographic Coupling Score", top_bib, G)
     output_path = os.path.join(base, "results_ex2/top_bibliographic_coupling.txt")
     print(f"Saving bibliographic coupling results to: {output_path}")
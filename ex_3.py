@@ -1,9 +1,10 @@
 import os
-import pickle
-import networkx as nx
+import graph_store
 import numpy as np
 from scipy.stats import pearsonr
 import pandas as pd
+from pagerank_engine import PageRankEngine, top_k
+from pagerank_solvers import PageRankSolver
 
 def analyze_pagerank_correlations(graph_file, k=50, alpha_values=np.arange(0.15, 1.0, 0.10)):
     """
@@ -12,28 +13,31 @@ def analyze_pagerank_correlations(graph_file, k=50, alpha_values=np.arange(0.15,
     """
     
     # Loadng the graph
-    with open(graph_file, 'rb') as f:
-        G = pickle.load(f)
+    G = graph_store.load_graph(graph_file)
     print(f"Graph loaded: {G.number_of_nodes():,} nodes, {G.number_of_edges():,} edges")
     print()
 
     # in-degree for the citations of the different nodes
-    citation_counts = dict(G.in_degree())
+    store = G.store
+    citation_counts = store.in_degrees()
+
+    # One warm-started sweep over all alpha values, one row per alpha; high
+    # alphas go to the accelerated solvers
+    alpha_values = list(alpha_values)
+    solver = PageRankSolver(PageRankEngine(store))
+    pagerank_results, reports = solver.sweep(alpha_values)
+    for alpha, report in zip(alpha_values, reports):
+        print(f"alpha={alpha:.2f}: {report['method']}, {report['matvecs']:g} matrix-vector products")
+    print()
 
     correlation_results = {}
-    pagerank_results = {}
-
-    # Going through different alpha values
-    for alpha in alpha_values:
-        pr = nx.pagerank(G, alpha=alpha)
-        pagerank_results[alpha] = pr
-
-        top_k = sorted(pr.items(), key=lambda x: x[1], reverse=True)[:k]
+    for row, alpha in enumerate(alpha_values):
+        top_k_nodes = top_k(pagerank_results[row], k)
 
-        pr_values = [score for _, score in top_k]
+        pr_values = pagerank_results[row, top_k_nodes]
         
         # obtaining the citation counts for the different nodes
-        citation_values = [citation_counts.get(node, 0) for node, _ in top_k]
+        citation_values = citation_counts[top_k_nodes]
 
         corr, _ = pearsonr(pr_values, citation_values)
         correlation_results[alpha] = corr
@@ -56,12 +60,11 @@ def analyze_pagerank_correlations(graph_file, k=50, alpha_values=np.arange(0.15,
 
     # To get the top papers for a given alpha, return df
     def top_papers(alpha, n=10):
-        pr = pagerank_results[alpha]
-        top_nodes = sorted(pr.items(), key=lambda x: x[1], reverse=True)[:n]
+        pr = pagerank_results[alpha_values.index(alpha)]
         data = []
-        for node, score in top_nodes:
-            title = G.nodes[node].get('title', 'Unknown Title')
-            data.append({'Title': title, 'PageRank Score': score})
+        for node in top_k(pr, n):
+            title = store.title(node)
+            data.append({'Title': title, 'PageRank Score': pr[node]})
         return pd.DataFrame(data)
 
     # Saving, Printing
@@ -87,4 +90,5 @@ def analyze_pagerank_correlations(graph_file, k=50, alpha_values=np.arange(0.15,
 
     return correlation_df, top_best_df, top_worst_df
 
-correlation_df, top_best_df, top_worst_df = analyze_pagerank_correlations('dblp_filtered_graph.gpickle', k=50)
+if __name__ == "__main__":
+    correlation_df, top_best_df, top_worst_df = analyze_pagerank_correlations(graph_store.STORE_PATH, k=50)
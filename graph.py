@@ -1,163 +1,424 @@
 import os
+import io
+import sys
+import shutil
+import tempfile
+import re
+import glob
+import gzip
 import json
+import time
+import numpy as np
 import networkx as nx
-import pickle
+import graph_store
+import graph_stats
+import title_index
+import instrumentation
+import columnar
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Configuration parameters
 MIN_CITATIONS = 60
 START_YEAR = 2010
 END_YEAR = 2015
 
+# Size of the byte ranges handed to the ingestion workers
+CHUNK_BYTES = 64 * 1024 * 1024
+# Read buffer for data files, plain or compressed
+READ_BUFFER = 16 * 1024 * 1024
+# Data files read from the data directory: plain, .gz or .zst
+DATA_GLOB = "dblp-ref-*.json*"
+DATA_SUFFIXES = (".json", ".json.gz", ".json.zst")
+COMPRESSED = (".gz", ".zst")
+# Names of the data files a graph store was built from, kept inside the store
+SOURCES_FILE = "data_files.json"
+
+# Keys of the fields the prefilter reads. Outside of strings a quote right after
+# "year" can only close a key, and quotes inside strings are escaped, so each
+# match is a real key (DBLP papers have no nested objects).
+YEAR_KEY = b'"year":'
+N_CITATION_KEY = b'"n_citation":'
+# an integer value ending where the number ends, so floats, strings and nulls do not match
+INT_VALUE = re.compile(rb'\s*(-?\d+)\s*[,}]')
+
+# Sorts dblp-ref-2.json before dblp-ref-10.json
+def _natural_key(path):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", os.path.basename(path))]
+
+# Data files matching pattern in data_directory, in natural order. Only .json,
+# .json.gz and .json.zst files are read, and of a plain file and its compressed
+# copy (what gzip -k leaves behind) only the plain one, so no paper is read twice
+def data_files(data_directory, pattern=DATA_GLOB):
+    found = [p for p in glob.glob(os.path.join(data_directory, pattern)) if p.endswith(DATA_SUFFIXES)]
+    by_stem = {}
+    for path in sorted(found, key=lambda p: (p.endswith(COMPRESSED), p)):
+        stem = path[:path.rindex(".json") + len(".json")]
+        if stem in by_stem:
+            print(f"Warning: skipping '{path}', a copy of '{by_stem[stem]}'")
+        else:
+            by_stem[stem] = path
+    files = sorted(by_stem.values(), key=_natural_key)
+    numbers = {int(m.group(1)) for m in (re.search(r"(\d+)\.json", os.path.basename(p)) for p in files) if m}
+    missing = sorted(set(range(max(numbers, default=-1) + 1)) - numbers)
+    if missing:
+        print(f"Warning: no data file numbered {', '.join(map(str, missing))} in '{data_directory}'")
+    return files
+
+# Warns about data files added or missing since a run that read the files named in previous
+def warn_changed_files(previous, files):
+    names = {os.path.basename(p) for p in files}
+    added = sorted(names - set(previous), key=_natural_key)
+    missing = sorted(set(previous) - names, key=_natural_key)
+    if added:
+        print(f"Warning: data files added since the last run: {', '.join(added)}")
+    if missing:
+        print(f"Warning: data files missing since the last run: {', '.join(missing)}")
+
+# Splits a file into byte ranges of roughly chunk_bytes each
+# Compressed files cannot be entered in the middle and make a single range
+def file_chunks(path, chunk_bytes=CHUNK_BYTES):
+    size = os.path.getsize(path)
+    if path.endswith(COMPRESSED):
+        return [(0, size)]
+    return [(start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+def open_data_file(path):
+    """Opens a plain, .gz or .zst data file for buffered binary reading."""
+    if path.endswith(".gz"):
+        return io.BufferedReader(gzip.GzipFile(fileobj=open(path, 'rb', buffering=READ_BUFFER)),
+                                 buffer_size=READ_BUFFER)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"Reading '{path}' needs the zstandard package")
+        raw = open(path, 'rb', buffering=READ_BUFFER)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, read_size=READ_BUFFER, closefd=True),
+                                 buffer_size=READ_BUFFER)
+    return open(path, 'rb', buffering=READ_BUFFER)
+
+def _int_field(line, key):
+    # the value of key when it is given once as a plain integer, else None
+    if line.count(key) != 1:
+        return None
+    value = INT_VALUE.match(line, line.find(key) + len(key))
+    return int(value.group(1)) if value else None
+
+def _prefilter(line, min_citations, start_year, end_year):
+    # True when the raw line certainly fails the criteria, so it need not be decoded.
+    # Lines without both fields as plain integers, with a field given twice or that
+    # do not look like one object are left to json.loads.
+    stripped = line.strip()
+    if not (stripped.startswith(b"{") and stripped.endswith(b"}")):
+        return False
+    n_citation = _int_field(line, N_CITATION_KEY)
+    if n_citation is None:
+        return False
+    if n_citation < min_citations:
+        return _int_field(line, YEAR_KEY) is not None
+    year = _int_field(line, YEAR_KEY)
+    return year is not None and not start_year <= year <= end_year
+
+def scan_chunk(json_file, start, end, min_citations, start_year, end_year, fast=True):
+    """
+    Parses every line that begins inside the byte range [start, end) of json_file.
+    Returns the number of lines seen, the qualified (id, title) pairs, the
+    (source, references) candidates of the qualified papers and the local
+    indices of the malformed lines, all in file order, followed by a dict with
+    the bytes read, the lines rejected before decoding and, when
+    instrumentation is on, the prefilter, decode and filter seconds.
+
+    With fast set, lines are first checked for year and n_citation on the raw
+    bytes and only qualifying or unclear lines are decoded. A rejected line is
+    still reported as malformed when it is not a single {...} object, but
+    damage inside such an object goes unnoticed; fast=False decodes every line.
+    """
+    line_count = 0
+    qualified = []
+    candidates = []
+    malformed = []
+    # per-line clocks only when someone is looking
+    timed = instrumentation.enabled()
+    prefilter_seconds = decode_seconds = filter_seconds = 0.0
+    prefiltered = 0
+    bytes_read = 0
+    with open_data_file(json_file) as f:
+        if start > 0:
+            # skip the line that started in the previous range
+            f.seek(start - 1)
+            f.readline()
+        # compressed files are read as a whole
+        position = f.tell() if start > 0 else 0
+        while position < end or json_file.endswith(COMPRESSED):
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            bytes_read += len(line)
+            line_count += 1
+            try:
+                if not line.strip():
+                    continue
+                if fast:
+                    if timed:
+                        t0 = time.perf_counter()
+                    rejected = _prefilter(line, min_citations, start_year, end_year)
+                    if timed:
+                        prefilter_seconds += time.perf_counter() - t0
+                    if rejected:
+                        prefiltered += 1
+                        continue
+                if timed:
+                    t0 = time.perf_counter()
+                paper = json.loads(line)
+                if timed:
+                    t1 = time.perf_counter()
+                    decode_seconds += t1 - t0
+                n_citation = paper.get("n_citation", 0)
+                year = paper.get("year", 0)
+                paper_id = paper.get("id")
+                if (paper_id and n_citation >= min_citations and start_year <= year <= end_year):
+                    qualified.append((paper_id, paper.get("title")))
+                    candidates.append((paper_id, paper.get("references", [])))
+                if timed:
+                    filter_seconds += time.perf_counter() - t1
+            except json.JSONDecodeError:
+                malformed.append(line_count)
+    stats = {"bytes": bytes_read, "prefiltered": prefiltered, "prefilter_seconds": prefilter_seconds,
+             "decode_seconds": decode_seconds, "filter_seconds": filter_seconds}
+    return line_count, qualified, candidates, malformed, stats
+
 # Builds the citation graph based on the specified criteria
-def build_citation_graph(data_directory, min_citations, start_year, end_year):
+# Every file is read once: byte ranges are parsed in a process pool and the
+# edges are resolved once the full set of qualified papers is known
+def build_citation_graph(data_directory, min_citations, start_year, end_year, workers=None,
+                         pattern=DATA_GLOB, fast=True, columns=None):
+    if columns is not None:
+        return subgraph_from_columns(columns, min_citations, start_year, end_year)
     qualified_papers = {}
-    json_files_to_process = [os.path.join(data_directory, f) for f in 
-                             ["dblp-ref-0.json", "dblp-ref-1.json", "dblp-ref-2.json", "dblp-ref-3.json"]]
-    for f_path in json_files_to_process:
-        if not os.path.exists(f_path):
-            print(f"Error: Data file '{f_path}' not found.")
-            print(f"Please check the path in the DATA_DIR variable.")
-            return None
+    json_files_to_process = data_files(data_directory, pattern)
+    if not json_files_to_process:
+        print(f"Error: No data files matching '{os.path.join(data_directory, pattern)}' found.")
+        print(f"Please check the path in the DATA_DIR variable.")
+        return None
+    if workers is None:
+        workers = os.cpu_count() or 1
     print(f"\nIdentifying qualified papers and titles:")
     print(f"Criteria: >= {min_citations} citations and year between {start_year}-{end_year}")
-    total_line_count = 0
-    for json_file in json_files_to_process:
-        print(f"Processing file: {os.path.basename(json_file)}")
-        e = 0
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    total_line_count += 1
-                    try:
-                        if not line.strip():
-                            continue
-                        paper = json.loads(line)
-                        n_citation = paper.get("n_citation", 0)
-                        year = paper.get("year", 0)
-                        paper_id = paper.get("id")
-                        if (paper_id and n_citation >= min_citations and start_year <= year <= end_year):
-                            qualified_papers[paper_id] = paper.get("title")
-                    except json.JSONDecodeError:
-                        print(f"\nWarning: Skipping malformed JSON line {total_line_count}")
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # submit every chunk up front, results are consumed in file order
+        pending = []
+        for json_file in json_files_to_process:
+            tasks = []
+            for start, end in file_chunks(json_file):
+                args = (json_file, start, end, min_citations, start_year, end_year, fast)
+                tasks.append(executor.submit(scan_chunk, *args) if executor else args)
+            pending.append((json_file, tasks))
+        total_line_count = 0
+        scanned = []
+        for json_file, tasks in pending:
+            print(f"Processing file: {os.path.basename(json_file)}")
+            e = 0
+            chunks = []
+            try:
+                for task in tasks:
+                    with instrumentation.span("ingest.chunk", file=os.path.basename(json_file)):
+                        result = task.result() if executor else scan_chunk(*task)
+                        line_count, qualified, candidates, malformed, stats = result
+                        instrumentation.count("ingest.lines", line_count)
+                        instrumentation.count("ingest.qualified", len(qualified))
+                        instrumentation.count("ingest.malformed", len(malformed))
+                        for name, value in stats.items():
+                            instrumentation.count(f"ingest.{name}", value)
+                    for local_line in malformed:
+                        print(f"\nWarning: Skipping malformed JSON line {total_line_count + local_line}")
                         e = 1
+                    total_line_count += line_count
+                    for paper_id, title in qualified:
+                        qualified_papers[paper_id] = title
+                    chunks.append(candidates)
                 if e == 0:
                     print(f"Scanned {total_line_count:,} papers, found {len(qualified_papers):,} qualified")
                 else:
                     print(f"Scanned {total_line_count:,} papers with some errors, found {len(qualified_papers):,} qualified")
-        except Exception as e:
-            print(f"\nAn error occurred during identifying qualified papers on {json_file}: {e}")
-            return None
+            except Exception as e:
+                print(f"\nAn error occurred during identifying qualified papers on {json_file}: {e}")
+                return None
+            scanned.append((json_file, total_line_count, e, chunks))
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
     if not qualified_papers:
         print("\nNo papers matched the criteria.")
         return None
     print(f"\nFound {len(qualified_papers):,} qualified papers out of {total_line_count:,} total papers.")
     print("\nBuilding graph:")
-    G = nx.DiGraph()
+    G = nx.DiGraph(data_files=[os.path.basename(p) for p in json_files_to_process])
     # Add all qualified papers as nodes
     for paper_id, title in qualified_papers.items():
         G.add_node(paper_id, title=title)
-    total_line_count = 0
     edge_count = 0
-    for json_file in json_files_to_process:
+    for json_file, line_count, e, chunks in scanned:
         print(f"Processing file: {os.path.basename(json_file)}")
-        e = 0
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    total_line_count += 1
-                    try:
-                        if not line.strip():
-                            continue
-                        paper = json.loads(line)
-                        source_id = paper.get("id")
-                        # Only consider edges from qualified papers
-                        if source_id in qualified_papers:
-                            references = paper.get("references", [])
-                            for target_id in references:
-                                if target_id in qualified_papers:
-                                    G.add_edge(source_id, target_id)
-                                    edge_count += 1
-                    except json.JSONDecodeError:
-                        e = 1
-                        pass
-                if e == 0:
-                    print(f"Scanned {total_line_count:,} papers, added {edge_count:,} edges.", end='\n')
-                else:
-                    print(f"Scanned {total_line_count:,} papers with some errors, added {edge_count:,} edges", end='\n')
-        except Exception as e:
-            print(f"\nAn error occurred during Pass 2 on {json_file}: {e}")
-            return None
+        with instrumentation.span("ingest.edges", file=os.path.basename(json_file)):
+            before = edge_count
+            for candidates in chunks:
+                # Only consider edges from qualified papers
+                for source_id, references in candidates:
+                    for target_id in references:
+                        if target_id in qualified_papers:
+                            G.add_edge(source_id, target_id)
+                            edge_count += 1
+            instrumentation.count("ingest.edges", edge_count - before)
+        if e == 0:
+            print(f"Scanned {line_count:,} papers, added {edge_count:,} edges.", end='\n')
+        else:
+            print(f"Scanned {line_count:,} papers with some errors, added {edge_count:,} edges", end='\n')
+    print(f"\nGraph built with {G.number_of_nodes():,} nodes and {G.number_of_edges():,} edges.")
+    return G
+
+# Derives the citation graph from the columnar corpus (a columnar.Columns or its path)
+# with array masks, without reading the raw files
+def subgraph_from_columns(columns, min_citations, start_year, end_year):
+    if isinstance(columns, str):
+        columns = columnar.Columns(columns)
+    print(f"\nSelecting papers from the columns in '{columns.path}':")
+    print(f"Criteria: >= {min_citations} citations and year between {start_year}-{end_year}")
+    with instrumentation.span("columns.select"):
+        keep, indptr, indices = columns.select(min_citations, start_year, end_year)
+    if len(keep) == 0:
+        print("\nNo papers matched the criteria.")
+        return None
+    print(f"\nFound {len(keep):,} qualified papers out of {columns.num_papers:,} total papers.")
+    ids = [columns.ids[i] for i in keep.tolist()]
+    G = nx.DiGraph()
+    G.add_nodes_from((paper_id, {"title": columns.title(i)}) for paper_id, i in zip(ids, keep.tolist()))
+    sources = np.repeat(np.arange(len(keep)), np.diff(indptr))
+    G.add_edges_from((ids[u], ids[v]) for u, v in zip(sources.tolist(), indices.tolist()))
     print(f"\nGraph built with {G.number_of_nodes():,} nodes and {G.number_of_edges():,} edges.")
     return G
 
 # Reporting the statistics of the graph
+# Computed over the store's integer edge arrays and cached next to the graph;
+# a plain networkx graph is written to a temporary store first
 def report_statistics(G):
     if G is None or G.number_of_nodes() == 0:
         print("Graph is empty. No statistics to report.")
         return
-    print("\nGraph Statistics Report ")
-    num_nodes = G.number_of_nodes()
-    print(f"Number of vertices (nodes): {num_nodes:,}")
-    num_edges = G.number_of_edges()
-    print(f"Number of edges (citations): {num_edges:,}")
-    wcc_generator = nx.weakly_connected_components(G)
-    wcc_list = list(wcc_generator)
-    num_wcc = len(wcc_list)
-    print(f"Number of weakly connected components (WCC): {num_wcc:,}")
-    scc_generator = nx.strongly_connected_components(G)
-    scc_list = list(scc_generator)
-    num_scc = len(scc_list)
-    print(f"Number of strongly connected components (SCC): {num_scc:,}")
-    if num_wcc > 0:
-        largest_wcc_nodes = max(wcc_list, key=len)
-        num_nodes_largest_wcc = len(largest_wcc_nodes)
-        print(f"Number of nodes in largest WCC: {num_nodes_largest_wcc:,}")
-        largest_wcc_graph = G.subgraph(largest_wcc_nodes)
-        num_edges_largest_wcc = largest_wcc_graph.number_of_edges()
-        print(f"Number of edges in largest WCC: {num_edges_largest_wcc:,}")
+    if hasattr(G, "store"):
+        stats = graph_stats.load_statistics(G.store)
     else:
-        print("Number of nodes in largest WCC: 0")
-        print("Number of edges in largest WCC: 0")
-    if num_scc > 0:
-        largest_scc_nodes = max(scc_list, key=len)
-        num_nodes_largest_scc = len(largest_scc_nodes)
-        print(f"Number of nodes in largest SCC: {num_nodes_largest_scc:,}")
-        # Number of edges in largest SCC
-        largest_scc_graph = G.subgraph(largest_scc_nodes)
-        num_edges_largest_scc = largest_scc_graph.number_of_edges()
-        print(f"Number of edges in largest SCC: {num_edges_largest_scc:,}")
-    else:
-        print("Number of nodes in largest SCC: 0")
-        print("Number of edges in largest SCC: 0")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.csr")
+            graph_store.save_graph(G, path)
+            stats = graph_stats.compute_statistics(graph_store.CSRGraph(path))
+    print("\nGraph Statistics Report ")
+    print(f"Number of vertices (nodes): {stats['num_nodes']:,}")
+    print(f"Number of edges (citations): {stats['num_edges']:,}")
+    wcc, scc = stats["wcc"], stats["scc"]
+    print(f"Number of weakly connected components (WCC): {wcc['count']:,}")
+    print(f"Number of strongly connected components (SCC): {scc['count']:,}")
+    print(f"Number of nodes in largest WCC: {wcc['largest_nodes']:,}")
+    print(f"Number of edges in largest WCC: {wcc['largest_edges']:,}")
+    print(f"Number of nodes in largest SCC: {scc['largest_nodes']:,}")
+    print(f"Number of edges in largest SCC: {scc['largest_edges']:,}")
+    for name in ("in_degree", "out_degree"):
+        degrees = stats[name]
+        label = name.replace("_", "-")
+        print(f"{label.capitalize()}: max {degrees['max']:,}, mean {degrees['mean']:.2f}, "
+              f"median {degrees['median']:.0f}, zero for {degrees['zero']:,} nodes")
+        buckets = ", ".join(f"{'0' if b == 0 else (2 ** (b - 1) if b == 1 else f'{2 ** (b - 1)}-{2 ** b - 1}')}: {c:,}"
+                            for b, c in enumerate(degrees["log2_histogram"]) if c)
+        print(f"  {label} distribution: {buckets}")
+    dag = stats["condensation"]
+    print(f"Condensation DAG: {dag['nodes']:,} nodes, {dag['edges']:,} edges, "
+          f"{dag['sources']:,} sources, {dag['sinks']:,} sinks, "
+          f"longest path {dag['longest_path_nodes']:,} components")
 
 # Main function to execute the graph building and reporting
 # Make sure to have the data files in the specified DATA_DIR
+# Optional arguments: MIN_CITATIONS START_YEAR END_YEAR, which rebuild the graph
+# (from the columnar corpus in seconds when columnar.py has converted it)
 def main():
     DATA_DIR = "./dblp.v10/dblp-ref"
-    graph_file = "dblp_filtered_graph.gpickle"
-    if os.path.exists(graph_file):
-        print(f"Found existing graph file '{graph_file}'. Loading it") 
-        with open(graph_file, 'rb') as f:
-            G = pickle.load(f)  
+    store_path = graph_store.STORE_PATH
+    legacy_graph_file = "dblp_filtered_graph.gpickle"
+    try:
+        if len(sys.argv) not in (1, 4):
+            raise ValueError
+        criteria = [int(arg) for arg in sys.argv[1:]] or None
+    except ValueError:
+        print("Usage: python graph.py [MIN_CITATIONS START_YEAR END_YEAR]")
+        return
+    if criteria is None and (os.path.exists(store_path) or os.path.exists(legacy_graph_file)):
+        print(f"Found existing graph. Loading it") 
+        with instrumentation.span("load_graph"):
+            G = graph_store.load_graph(store_path if os.path.exists(store_path) else legacy_graph_file)
         print(f"Graph loaded: {G.number_of_nodes():,} nodes, {G.number_of_edges():,} edges.")
     else:
-        print(f"Graph file '{graph_file}' not found. Hence building graph from scratch.") 
-        G = build_citation_graph(
-            DATA_DIR, 
-            MIN_CITATIONS, 
-            START_YEAR, 
-            END_YEAR
-        )
-        # Save the graph for future use in a pickle file
-        if G:
-            with open(graph_file, 'wb') as f:
-                pickle.dump(G, f, pickle.HIGHEST_PROTOCOL)
-            print(f"Graph saved at {graph_file}")
+        min_citations, start_year, end_year = criteria or (MIN_CITATIONS, START_YEAR, END_YEAR)
+        # the new graph is built beside the current store, which stays in place until it succeeds
+        staging = store_path + ".new"
+        retired = store_path + ".old"
+        shutil.rmtree(staging, ignore_errors=True)
+        built = False
+        if os.path.exists(os.path.join(columnar.COLUMNS_PATH, "meta.json")):
+            columns = columnar.Columns(columnar.COLUMNS_PATH)
+            if os.path.isdir(DATA_DIR) and not columns.is_current(DATA_DIR):
+                print(f"Warning: the data files changed since '{columnar.COLUMNS_PATH}' was converted")
+            print(f"Deriving graph from the columns in '{columnar.COLUMNS_PATH}'.")
+            with instrumentation.span("build_citation_graph"):
+                size = columns.write_subgraph(staging, min_citations, start_year, end_year)
+            if size is None:
+                print("No papers matched the criteria.")
+            else:
+                print(f"Graph built with {size[0]:,} nodes and {size[1]:,} edges.")
+                sources = [f["name"] for f in columns.meta["files"]]
+                built = True
         else:
+            if criteria is None:
+                print(f"Graph store '{store_path}' not found. Hence building graph from scratch.")
+            else:
+                print(f"Rebuilding graph from the data files in '{DATA_DIR}'.")
+            with instrumentation.span("build_citation_graph"):
+                G = build_citation_graph(
+                    DATA_DIR, 
+                    min_citations, 
+                    start_year, 
+                    end_year
+                )
+            # Save the graph for future use in the graph store
+            if G:
+                with instrumentation.span("save_graph"):
+                    graph_store.save_graph(G, staging)
+                sources = G.graph["data_files"]
+                built = True
+        if not built:
+            shutil.rmtree(staging, ignore_errors=True)
             print("Graph building failed. Exiting")
             return
+        # a rebuild from a different set of data files is most likely a missing or extra file
+        if os.path.exists(os.path.join(store_path, SOURCES_FILE)):
+            with open(os.path.join(store_path, SOURCES_FILE)) as f:
+                warn_changed_files(json.load(f), sources)
+        with open(os.path.join(staging, SOURCES_FILE), "w") as f:
+            json.dump(sources, f)
+        with instrumentation.span("title_index"):
+            title_index.build_index(graph_store.CSRGraph(staging))
+        shutil.rmtree(retired, ignore_errors=True)
+        if os.path.exists(store_path):
+            os.replace(store_path, retired)
+        os.replace(staging, store_path)
+        shutil.rmtree(retired, ignore_errors=True)
+        print(f"Graph saved at {store_path}")
+        print(f"Title index saved at {os.path.join(store_path, title_index.INDEX_DIR)}")
+        G = graph_store.load_graph(store_path)
     if G:
-        report_statistics(G)
+        with instrumentation.span("report_statistics"):
+            report_statistics(G)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import os
+import json
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+# Statistics are cached in this file inside the graph store
+STATS_FILE = "stats.json"
+
+
+def weak_components(n, sources, targets):
+    """
+    Weakly connected component label of every node, by vectorized union-find:
+    every edge hooks the larger root onto the smaller one, then pointer jumping
+    flattens the trees, until no edge joins two different roots.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    while True:
+        lu, lv = labels[sources], labels[targets]
+        differ = lu != lv
+        if not differ.any():
+            break
+        lu, lv = lu[differ], lv[differ]
+        np.minimum.at(labels, np.maximum(lu, lv), np.minimum(lu, lv))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        sources, targets = sources[differ], targets[differ]
+    # dense labels 0..k-1
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels.ravel()
+
+
+def strong_components(store):
+    # scipy runs Pearce's iterative variant of Tarjan's algorithm
+    n = store.num_nodes
+    A = sp.csr_matrix((np.ones(store.num_edges, dtype=np.int8), np.asarray(store.indices),
+                       np.asarray(store.indptr)), shape=(n, n))
+    _, labels = connected_components(A, directed=True, connection="strong")
+    return labels
+
+
+def _component_summary(labels, sources, targets):
+    sizes = np.bincount(labels)
+    # edges with both ends in the same component, counted per component
+    inside = labels[sources] == labels[targets]
+    edges = np.bincount(labels[sources][inside], minlength=len(sizes))
+    largest = int(np.argmax(sizes)) if len(sizes) else 0
+    return {
+        "count": int(len(sizes)),
+        "largest_nodes": int(sizes[largest]) if len(sizes) else 0,
+        "largest_edges": int(edges[largest]) if len(sizes) else 0,
+        "singletons": int((sizes == 1).sum()),
+    }
+
+
+def _degree_summary(degrees):
+    # counts per power-of-two bucket: 0, 1, 2-3, 4-7, ...
+    buckets = np.zeros(len(degrees), dtype=np.int64)
+    positive = degrees > 0
+    buckets[positive] = np.floor(np.log2(degrees[positive])).astype(np.int64) + 1
+    histogram = np.bincount(buckets)
+    return {
+        "max": int(degrees.max()) if len(degrees) else 0,
+        "mean": float(degrees.mean()) if len(degrees) else 0.0,
+        "median": float(np.median(degrees)) if len(degrees) else 0.0,
+        "zero": int((degrees == 0).sum()),
+        "log2_histogram": histogram.tolist(),
+    }
+
+
+def _condensation(scc_labels, sources, targets):
+    # distinct edges between strong components, as (k, dag sources, dag targets)
+    k = int(scc_labels.max()) + 1 if len(scc_labels) else 0
+    cu, cv = scc_labels[sources], scc_labels[targets]
+    between = cu != cv
+    keys = np.unique(cu[between].astype(np.int64) * k + cv[between])
+    return k, keys // k, keys % k
+
+
+def dag_layers(k, dag_sources, dag_targets):
+    """
+    Layer of every node of a DAG with k nodes by peeling zero in-degree layers
+    (Kahn's algorithm, one layer per round): every edge goes to a later layer.
+    """
+    in_degree = np.bincount(dag_targets, minlength=k)
+    out_degree = np.bincount(dag_sources, minlength=k)
+    order = np.argsort(dag_sources, kind="stable")
+    indptr = np.zeros(k + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(out_degree)
+    succ = dag_targets[order]
+    remaining = in_degree.copy()
+    layers = np.zeros(k, dtype=np.int64)
+    layer = np.flatnonzero(remaining == 0)
+    depth = 0
+    while len(layer):
+        layers[layer] = depth
+        depth += 1
+        counts = out_degree[layer]
+        starts = np.repeat(indptr[layer] - np.cumsum(counts) + counts, counts)
+        nxt = succ[starts + np.arange(int(counts.sum()))]
+        np.subtract.at(remaining, nxt, 1)
+        nxt = np.unique(nxt)
+        layer = nxt[remaining[nxt] == 0]
+    return layers
+
+
+def condensation_layers(store):
+    """Layer of every paper's strong component in the condensation DAG; citing papers come first."""
+    sources = store.edge_sources().astype(np.int64)
+    targets = np.asarray(store.indices, dtype=np.int64)
+    scc = strong_components(store)
+    return dag_layers(*_condensation(scc, sources, targets))[scc]
+
+
+def _condensation_summary(scc_labels, sources, targets):
+    k, dag_sources, dag_targets = _condensation(scc_labels, sources, targets)
+    in_degree = np.bincount(dag_targets, minlength=k)
+    out_degree = np.bincount(dag_sources, minlength=k)
+    # longest path in nodes: the number of layers
+    depth = int(dag_layers(k, dag_sources, dag_targets).max()) + 1 if k else 0
+    return {
+        "nodes": k,
+        "edges": int(len(dag_sources)),
+        "sources": int((in_degree == 0).sum()),
+        "sinks": int((out_degree == 0).sum()),
+        "longest_path_nodes": depth,
+    }
+
+
+def compute_statistics(store):
+    sources = store.edge_sources().astype(np.int64)
+    targets = np.asarray(store.indices, dtype=np.int64)
+    wcc = weak_components(store.num_nodes, sources, targets)
+    scc = strong_components(store)
+    return {
+        "fingerprint": store.fingerprint,
+        "num_nodes": store.num_nodes,
+        "num_edges": store.num_edges,
+        "wcc": _component_summary(wcc, sources, targets),
+        "scc": _component_summary(scc, sources, targets),
+        "in_degree": _degree_summary(store.in_degrees()),
+        "out_degree": _degree_summary(store.out_degrees()),
+        "condensation": _condensation_summary(scc, sources, targets),
+    }
+
+
+def load_statistics(store):
+    """Statistics of the store, from the cache next to the graph when it is current."""
+    path = os.path.join(store.path, STATS_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            stats = json.load(f)
+        if stats.get("fingerprint") == store.fingerprint:
+            return stats
+    stats = compute_statistics(store)
+    try:
+        with open(path, "w") as f:
+            json.dump(stats, f)
+    except OSError:
+        pass
+    return stats
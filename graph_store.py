@@ -0,0 +1,301 @@
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+import networkx as nx
+
+# Default location of the compact graph store written by graph.py
+STORE_PATH = "dblp_filtered_graph.csr"
+FORMAT_VERSION = 1
+
+
+def save_strings(path, name, strings):
+    # strings are stored as one utf-8 blob plus an offsets array
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    with open(os.path.join(path, f"{name}.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(path, f"{name}_offsets.npy"), offsets)
+
+
+def concat_ranges(starts, lengths):
+    # concatenation of arange(s, s + l) for every (s, l)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(np.asarray(starts, dtype=np.int64) - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+def _csr_from_lists(neighbour_lists, index):
+    indptr = np.zeros(len(neighbour_lists) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(nbrs) for nbrs in neighbour_lists], dtype=np.int64)
+    indices = np.fromiter((index[v] for nbrs in neighbour_lists for v in nbrs),
+                          dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def write_store(path, ids, titles, indptr, indices, rev_indptr=None, rev_indices=None):
+    """
+    Writes a graph store from dense arrays. Node i has DBLP id ids[i] and title
+    titles[i] (None when missing); its successors are indices[indptr[i]:indptr[i+1]].
+    The reverse CSR is derived (stable in source order) when it is not given.
+    """
+    os.makedirs(path, exist_ok=True)
+    n = len(ids)
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int32)
+    if rev_indptr is None:
+        sources = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        rev_indices = sources[order]
+        rev_indptr = np.zeros(n + 1, dtype=np.int64)
+        rev_indptr[1:] = np.cumsum(np.bincount(indices, minlength=n))
+    rev_indptr = np.asarray(rev_indptr, dtype=np.int64)
+    rev_indices = np.asarray(rev_indices, dtype=np.int32)
+    save_strings(path, "ids", ids)
+    save_strings(path, "titles", [t if t is not None else "" for t in titles])
+    np.save(os.path.join(path, "title_mask.npy"), np.array([t is not None for t in titles], dtype=bool))
+    # permutation of the nodes sorted by id, used for id lookups
+    id_order = np.array(sorted(range(n), key=ids.__getitem__), dtype=np.int32)
+    np.save(os.path.join(path, "id_order.npy"), id_order)
+    for name, arr in [("indptr", indptr), ("indices", indices),
+                      ("rev_indptr", rev_indptr), ("rev_indices", rev_indices)]:
+        np.save(os.path.join(path, f"{name}.npy"), arr)
+    digest = hashlib.sha1()
+    for arr in (indptr, indices):
+        digest.update(arr.tobytes())
+    digest.update("\n".join(ids).encode("utf-8"))
+    meta = {"format": FORMAT_VERSION, "num_nodes": n, "num_edges": int(indptr[-1]),
+            "fingerprint": digest.hexdigest()}
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def save_graph(G, path=STORE_PATH):
+    """
+    Converts a networkx DiGraph into a store. Dense ids follow the node order of G,
+    and successor/predecessor lists keep the order networkx reports them in.
+    """
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    indptr, indices = _csr_from_lists([G.succ[node] for node in nodes], index)
+    rev_indptr, rev_indices = _csr_from_lists([G.pred[node] for node in nodes], index)
+    titles = [G.nodes[node].get("title") for node in nodes]
+    write_store(path, [str(node) for node in nodes], titles, indptr, indices, rev_indptr, rev_indices)
+
+
+class StringTable:
+    """Memory-mapped table of utf-8 strings, decoded on access."""
+
+    def __init__(self, path, name):
+        self.offsets = np.load(os.path.join(path, f"{name}_offsets.npy"), mmap_mode="r")
+        blob_path = os.path.join(path, f"{name}.bin")
+        if os.path.getsize(blob_path) > 0:
+            self.data = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            self.data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+class CSRGraph:
+    """
+    Graph store loaded from disk. Nodes are dense integers 0..n-1; every array is
+    memory-mapped so opening a store costs the same regardless of its size.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph store format in '{path}'")
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        self.indptr = load("indptr")
+        self.indices = load("indices")
+        self.rev_indptr = load("rev_indptr")
+        self.rev_indices = load("rev_indices")
+        self.title_mask = load("title_mask")
+        self.id_order = load("id_order")
+        self.ids = StringTable(path, "ids")
+        self.titles = StringTable(path, "titles")
+        self.num_nodes = self.meta["num_nodes"]
+        self.num_edges = self.meta["num_edges"]
+        self.fingerprint = self.meta["fingerprint"]
+
+    def node_id(self, i):
+        return self.ids[i]
+
+    def index_of(self, node_id):
+        # binary search over the id-sorted permutation
+        lo, hi = 0, self.num_nodes
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ids[self.id_order[mid]] < node_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_nodes and self.ids[self.id_order[lo]] == node_id:
+            return int(self.id_order[lo])
+        raise KeyError(node_id)
+
+    def title(self, i):
+        return self.titles[i] if self.title_mask[i] else None
+
+    def successors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def predecessors(self, i):
+        return self.rev_indices[self.rev_indptr[i]:self.rev_indptr[i + 1]]
+
+    def out_degrees(self):
+        return np.diff(self.indptr)
+
+    def in_degrees(self):
+        return np.diff(self.rev_indptr)
+
+    def edge_sources(self):
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), self.out_degrees())
+
+
+class NodeView:
+    def __init__(self, store):
+        self._store = store
+
+    def __call__(self, data=False):
+        if data:
+            return ((self._store.ids[i], {"title": self._store.title(i)}) for i in range(self._store.num_nodes))
+        return iter(self)
+
+    def __iter__(self):
+        return (self._store.ids[i] for i in range(self._store.num_nodes))
+
+    def __len__(self):
+        return self._store.num_nodes
+
+    def __contains__(self, node):
+        try:
+            self._store.index_of(node)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, node):
+        return {"title": self._store.title(self._store.index_of(node))}
+
+
+class DegreeView:
+    def __init__(self, store, degrees):
+        self._store = store
+        self._degrees = degrees
+
+    def __call__(self, node=None):
+        if node is None:
+            return iter(self)
+        return self[node]
+
+    def __getitem__(self, node):
+        return int(self._degrees[self._store.index_of(node)])
+
+    def __iter__(self):
+        degrees = self._degrees.tolist()
+        return ((self._store.ids[i], degrees[i]) for i in range(self._store.num_nodes))
+
+    def __len__(self):
+        return self._store.num_nodes
+
+
+class GraphView:
+    """
+    Read-only networkx-style view over a CSRGraph for code that works with DBLP ids
+    (G.nodes[n]["title"], successors, predecessors, in_degree, ...).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.nodes = NodeView(store)
+        self._in_degrees = None
+        self._out_degrees = None
+        self._nx = None
+
+    @property
+    def in_degree(self):
+        if self._in_degrees is None:
+            self._in_degrees = self.store.in_degrees()
+        return DegreeView(self.store, self._in_degrees)
+
+    @property
+    def out_degree(self):
+        if self._out_degrees is None:
+            self._out_degrees = self.store.out_degrees()
+        return DegreeView(self.store, self._out_degrees)
+
+    def number_of_nodes(self):
+        return self.store.num_nodes
+
+    def number_of_edges(self):
+        return self.store.num_edges
+
+    def __len__(self):
+        return self.store.num_nodes
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def successors(self, node):
+        return (self.store.ids[j] for j in self.store.successors(self.store.index_of(node)))
+
+    def predecessors(self, node):
+        return (self.store.ids[j] for j in self.store.predecessors(self.store.index_of(node)))
+
+    def has_edge(self, u, v):
+        try:
+            i, j = self.store.index_of(u), self.store.index_of(v)
+        except KeyError:
+            return False
+        return bool(np.any(self.store.successors(i) == j))
+
+    def edges(self):
+        ids = self.store.ids
+        for i in range(self.store.num_nodes):
+            for j in self.store.successors(i):
+                yield ids[i], ids[j]
+
+    def to_networkx(self):
+        # materialized once, for code that still needs networkx algorithms
+        if self._nx is None:
+            G = nx.DiGraph()
+            for node, data in self.nodes(data=True):
+                G.add_node(node, **data)
+            G.add_edges_from(self.edges())
+            self._nx = G
+        return self._nx
+
+
+def load_graph(path=STORE_PATH):
+    """
+    Opens a graph store and returns its GraphView. A pickled networkx graph
+    (the old .gpickle format) is converted into a store next to it first.
+    """
+    base = os.path.splitext(path)[0]
+    if not os.path.isdir(path):
+        pickle_path = path if os.path.isfile(path) else base + ".gpickle"
+        if not os.path.isfile(pickle_path):
+            raise FileNotFoundError(f"Graph store '{path}' not found")
+        path = base + ".csr"
+        if not os.path.isdir(path):
+            print(f"Converting pickled graph '{pickle_path}' to graph store '{path}'")
+            with open(pickle_path, "rb") as f:
+                save_graph(pickle.load(f), path)
+    return GraphView(CSRGraph(path))
@@ -0,0 +1,152 @@
+import os
+import shutil
+import numpy as np
+import graph_store
+from topic_pagerank import DAMPING_FACTOR
+
+
+class GraphDelta:
+    """
+    What patch_store changed: the node count before the patch and, for every
+    source that gained edges, its successor list before the patch.
+    """
+
+    def __init__(self, old_num_nodes, old_successors):
+        self.old_num_nodes = old_num_nodes
+        self.old_successors = old_successors
+
+
+def patch_store(path, new_nodes=(), new_edges=()):
+    """
+    Adds papers [(id, title), ...] and citations [(source id, target id), ...]
+    to the graph store at path. Existing papers keep their dense ids and new
+    ones are appended in the order given; edges already present are ignored.
+    The new store is written beside the old one and swapped in, so stores that
+    are still open keep reading the old arrays. Returns a GraphDelta.
+    """
+    store = graph_store.CSRGraph(path)
+    n = store.num_nodes
+    ids = [store.ids[i] for i in range(n)]
+    titles = [store.title(i) for i in range(n)]
+    index = {}
+    for node_id, title in new_nodes:
+        try:
+            store.index_of(node_id)
+            continue
+        except KeyError:
+            pass
+        if node_id not in index:
+            index[node_id] = len(ids)
+            ids.append(node_id)
+            titles.append(title)
+
+    def dense(node_id):
+        if node_id in index:
+            return index[node_id]
+        return store.index_of(node_id)
+
+    added = {}
+    for source, target in new_edges:
+        added.setdefault(dense(source), []).append(dense(target))
+    indptr = np.asarray(store.indptr)
+    indices = np.asarray(store.indices)
+    successors = {}
+    old_successors = {}
+    for u, targets in added.items():
+        old = indices[indptr[u]:indptr[u + 1]] if u < n else np.zeros(0, dtype=np.int32)
+        seen = set(old.tolist())
+        fresh = [v for v in dict.fromkeys(targets) if v not in seen]
+        if fresh:
+            old_successors[u] = old
+            successors[u] = np.concatenate([old, np.array(fresh, dtype=np.int32)])
+
+    # rebuild the forward CSR with the grown rows
+    degrees = np.zeros(len(ids), dtype=np.int64)
+    degrees[:n] = np.diff(indptr)
+    for u, succ in successors.items():
+        degrees[u] = len(succ)
+    new_indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    new_indptr[1:] = np.cumsum(degrees)
+    new_indices = np.empty(new_indptr[-1], dtype=np.int32)
+    unchanged = np.ones(n, dtype=bool)
+    unchanged[[u for u in successors if u < n]] = False
+    rows = np.flatnonzero(unchanged & (degrees[:n] > 0))
+    new_indices[graph_store.concat_ranges(new_indptr[rows], degrees[rows])] = indices[graph_store.concat_ranges(indptr[rows], degrees[rows])]
+    for u, succ in successors.items():
+        new_indices[new_indptr[u]:new_indptr[u + 1]] = succ
+
+    staging = path.rstrip(os.sep) + ".patch"
+    retired = path.rstrip(os.sep) + ".old"
+    shutil.rmtree(staging, ignore_errors=True)
+    graph_store.write_store(staging, ids, titles, new_indptr, new_indices)
+    shutil.rmtree(retired, ignore_errors=True)
+    os.replace(path, retired)
+    os.replace(staging, path)
+    shutil.rmtree(retired, ignore_errors=True)
+    print(f"Graph patched: {len(ids) - n:,} new papers, "
+          f"{int(new_indptr[-1]) - store.num_edges:,} new citations")
+    return GraphDelta(n, old_successors)
+
+
+def update_pagerank(store, delta, x, alpha=DAMPING_FACTOR, teleport=None, tol=1.0e-6):
+    """
+    Updates a PageRank vector x of the graph before the patch to the patched
+    store by pushing residuals from the changed papers only.
+
+    teleport holds the (unnormalized) personalization weights over the patched
+    graph, ones for plain PageRank; weights of existing papers must be the ones
+    x was computed with. With y = vR the solution of y = alpha y P + v, the
+    networkx PageRank is y / |y|, and a patch only changes the residual
+    v + alpha y P - y around new papers and sources with new edges. Residuals
+    are pushed until the L1 error of the result is below tol relative to an
+    exact solve started from x.
+
+    Returns (new x, stats) where stats counts the pushes and edges touched.
+    """
+    n_old, n = delta.old_num_nodes, store.num_nodes
+    indptr = np.asarray(store.indptr)
+    indices = np.asarray(store.indices)
+    degrees = np.diff(indptr)
+    if teleport is None:
+        teleport = np.ones(n)
+    teleport = np.asarray(teleport, dtype=float)
+
+    # back to the unnormalized solution y = vR of the old graph
+    old_degrees = degrees[:n_old].copy()
+    for u, succ in delta.old_successors.items():
+        if u < n_old:
+            old_degrees[u] = len(succ)
+    dangling_mass = x[old_degrees == 0].sum()
+    y = np.zeros(n)
+    y[:n_old] = x * teleport[:n_old].sum() / (1 - alpha + alpha * dangling_mass)
+
+    # residual of the patched system: new teleport mass and the moved out-links
+    r = np.zeros(n)
+    r[n_old:] = teleport[n_old:]
+    for u, old_succ in delta.old_successors.items():
+        if u >= n_old or y[u] == 0:
+            continue
+        if len(old_succ):
+            np.add.at(r, old_succ, -alpha * y[u] / len(old_succ))
+        succ = indices[indptr[u]:indptr[u + 1]]
+        np.add.at(r, succ, alpha * y[u] / len(succ))
+
+    # |y* - y| <= |r| / (1 - alpha), so keep every residual under eps
+    eps = tol * (1 - alpha) * y.sum() / n
+    frontier = np.flatnonzero(np.abs(r) > eps)
+    pushes = 0
+    edges = 0
+    while len(frontier):
+        mass = r[frontier]
+        y[frontier] += mass
+        r[frontier] = 0
+        counts = degrees[frontier]
+        targets = indices[graph_store.concat_ranges(indptr[frontier], counts)]
+        np.add.at(r, targets, np.repeat(alpha * mass / np.maximum(counts, 1), counts))
+        pushes += len(frontier)
+        edges += len(targets)
+        touched = np.unique(targets)
+        frontier = touched[np.abs(r[touched]) > eps]
+    stats = {"pushes": pushes, "edges": edges, "residual": float(np.abs(r).sum()),
+             "error_bound": float(2 * np.abs(r).sum() / (1 - alpha) / y.sum())}
+    return y / y.sum(), stats
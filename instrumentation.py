@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import atexit
+import resource
+from collections import defaultdict
+
+# Set to a file name to record spans and counters and write them there at exit:
+# a name ending in .trace.json gets the Chrome trace format (chrome://tracing,
+# Perfetto, speedscope), anything else a JSON summary
+TRACE_ENV = "PAGERANK_TRACE"
+TRACE_SUFFIX = ".trace.json"
+# Process that writes the file; worker processes inherit the environment and
+# record for their own use only
+OWNER_ENV = "PAGERANK_TRACE_OWNER"
+
+_enabled = False
+_start = time.perf_counter()
+# finished spans as (name, start, duration, args, counters)
+_spans = []
+_counters = defaultdict(float)
+_series = defaultdict(list)
+# open spans, innermost last, each with the counters added while it was open
+_stack = []
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.counters = defaultdict(float)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        _stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        _stack.pop()
+        _spans.append((self.name, self.start - _start, duration, self.args, dict(self.counters)))
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(path=None):
+    """Starts recording; with a path, the results are written there at exit."""
+    global _enabled
+    _enabled = True
+    if path:
+        atexit.register(export, path)
+
+
+def span(name, **args):
+    """Context manager timing a named region; free when recording is off."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def count(name, value=1):
+    """Adds to a counter, and to the same counter of every open span."""
+    if not _enabled:
+        return
+    _counters[name] += value
+    for open_span in _stack:
+        open_span.counters[name] += value
+
+
+def record(name, value):
+    """Appends one value to a series, e.g. the residual of every iteration."""
+    if _enabled:
+        _series[name].append((time.perf_counter() - _start, float(value)))
+
+
+def peak_rss_mb():
+    # Linux carries ru_maxrss over exec, so the parent's size would leak into a
+    # fresh interpreter; VmHWM starts afresh. Worker processes count through RUSAGE_CHILDREN.
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    try:
+        with open("/proc/self/status") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = max(own, children)
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rates(counters, seconds):
+    # seconds counters are shares of the span, not throughput
+    return {name + "_per_sec": value / seconds for name, value in counters.items()
+            if seconds > 0 and not name.endswith("_seconds")}
+
+
+def summary():
+    """Totals per span name with counter rates, counters, series and peak RSS."""
+    spans = {}
+    for name, _, duration, _, counters in _spans:
+        entry = spans.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "counters": defaultdict(float)})
+        entry["calls"] += 1
+        entry["seconds"] += duration
+        entry["max_seconds"] = max(entry["max_seconds"], duration)
+        for key, value in counters.items():
+            entry["counters"][key] += value
+    for entry in spans.values():
+        entry["counters"] = dict(entry["counters"])
+        entry["rates"] = _rates(entry["counters"], entry["seconds"])
+    return {
+        "argv": sys.argv,
+        "wall_seconds": time.perf_counter() - _start,
+        "peak_rss_mb": peak_rss_mb(),
+        "spans": spans,
+        "counters": dict(_counters),
+        "series": {name: [value for _, value in values] for name, values in _series.items()},
+    }
+
+
+def trace_events():
+    """The spans as Chrome trace events, with series as counter tracks."""
+    pid = os.getpid()
+    events = [{"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6, "pid": pid, "tid": 0,
+               "args": {**args, **counters, **_rates(counters, duration)}}
+              for name, start, duration, args, counters in _spans]
+    for name, values in _series.items():
+        events.extend({"name": name, "ph": "C", "ts": t * 1e6, "pid": pid, "args": {"value": value}}
+                      for t, value in values)
+    return events
+
+
+def export(path):
+    if path.endswith(TRACE_SUFFIX):
+        data = {"traceEvents": trace_events(), "otherData": {"peak_rss_mb": peak_rss_mb()}}
+    else:
+        data = summary()
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+    print(f"Instrumentation written to {path}", file=sys.stderr)
+
+
+if os.environ.get(TRACE_ENV):
+    _owner = os.environ.setdefault(OWNER_ENV, str(os.getpid()))
+    enable(os.environ[TRACE_ENV] if _owner == str(os.getpid()) else None)
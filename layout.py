@@ -0,0 +1,330 @@
+import numpy as np
+import graph_stats
+import instrumentation
+
+# Barnes-Hut opening criterion: a cell of width w at distance d is treated as
+# one body when w / d < THETA
+THETA = 1.0
+# Deepest quadtree level; positions closer than 2^-MAX_DEPTH share a leaf
+MAX_DEPTH = 16
+# Nodes whose tree walks run together (bounds the size of the pair arrays)
+WALK_CHUNK = 20000
+# Graphs are coarsened until they have at most this many nodes
+COARSEST = 100
+# Pull towards the centre that keeps the block of small components together
+GRAVITY = 4.0
+# Components with fewer nodes are laid out together as one block
+SMALL_COMPONENT = COARSEST
+# Width over height of the packed blocks (the raster is 3:2)
+ASPECT = 1.5
+
+
+def _interleave(v):
+    # spread the low 16 bits of v so a zero bit separates each of them
+    v = v & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+class QuadTree:
+    """
+    Linear quadtree built from Morton codes. For every level it holds the sorted
+    cell keys with their mass and centre of mass, so a tree walk is a series of
+    searchsorted lookups instead of pointer chasing.
+    """
+
+    def __init__(self, pos, depth=MAX_DEPTH):
+        self.depth = depth
+        lo = pos.min(axis=0)
+        self.extent = max(float((pos.max(axis=0) - lo).max()), 1e-12) * (1 + 1e-9)
+        cells = np.minimum(((pos - lo) / self.extent * (1 << depth)).astype(np.int64), (1 << depth) - 1)
+        codes = _interleave(cells[:, 0]) | (_interleave(cells[:, 1]) << 1)
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes
+        sorted_codes = codes[order]
+        sorted_pos = pos[order]
+        self.keys, self.mass, self.centre = [], [], []
+        for level in range(depth + 1):
+            level_codes = sorted_codes >> (2 * (depth - level))
+            starts = np.flatnonzero(np.r_[True, level_codes[1:] != level_codes[:-1]])
+            mass = np.diff(np.r_[starts, len(level_codes)])
+            self.keys.append(level_codes[starts])
+            self.mass.append(mass)
+            self.centre.append(np.add.reduceat(sorted_pos, starts, axis=0) / mass[:, None])
+        # children of cell c on level l are cells first_child[l][c] ... first_child[l][c + 1] - 1 on level l + 1
+        self.first_child = [np.searchsorted(self.keys[level + 1] >> 2, np.r_[self.keys[level], self.keys[level][-1] + 1])
+                            for level in range(depth)]
+
+    def repulsion(self, pos, strength, theta=THETA, chunk=WALK_CHUNK, nodes=None):
+        """
+        Sum over all other nodes of strength * mass / d along the separating
+        direction, for the given nodes (all by default).
+        """
+        if nodes is None:
+            nodes = np.arange(len(pos))
+        force = np.zeros((len(nodes), 2))
+        for lo in range(0, len(nodes), chunk):
+            force[lo:lo + chunk] = self._walk(pos, nodes[lo:lo + chunk], strength, theta)
+        return force
+
+    def _walk(self, pos, nodes, strength, theta):
+        force = np.zeros((len(nodes), 2))
+        # (node, cell) pairs still to visit, starting at the root
+        who = np.arange(len(nodes))
+        cell = np.zeros(len(nodes), dtype=np.int64)
+        for level in range(self.depth + 1):
+            width = self.extent / (1 << level)
+            delta = pos[nodes[who]] - self.centre[level][cell]
+            dist = np.sqrt((delta ** 2).sum(axis=1))
+            own = (self.codes[nodes[who]] >> (2 * (self.depth - level))) == self.keys[level][cell]
+            mass = self.mass[level][cell] - own
+            leaf = level == self.depth
+            # far cells and single other nodes are final; so is a cell holding only the node itself
+            accept = (((width < theta * dist) | (mass == 1)) & ~own) | (mass == 0) | leaf
+            use = accept & (mass > 0) & (dist > 0)
+            scale = strength * mass[use] / dist[use] ** 2
+            for axis in range(2):
+                force[:, axis] += np.bincount(who[use], weights=scale * delta[use, axis], minlength=len(nodes))
+            # open the remaining cells
+            who, cell = who[~accept], cell[~accept]
+            if leaf or len(who) == 0:
+                break
+            first = self.first_child[level][cell]
+            counts = self.first_child[level][cell + 1] - first
+            who = np.repeat(who, counts)
+            cell = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+        return force
+
+
+def _undirected(n, sources, targets):
+    keep = sources != targets
+    a = np.minimum(sources[keep], targets[keep]).astype(np.int64)
+    b = np.maximum(sources[keep], targets[keep]).astype(np.int64)
+    keys = np.unique(a * n + b)
+    return keys // n, keys % n
+
+
+def coarsen(n, sources, targets, rng):
+    """
+    One level of matching-based coarsening: every unmatched node proposes to
+    a random unmatched neighbour and mutual proposals merge; nodes left over
+    join a matched neighbour. Returns the coarse id of every node and the
+    coarse edges.
+    """
+    parent = np.full(n, -1, dtype=np.int64)
+    for _ in range(3):
+        free = (parent[sources] < 0) & (parent[targets] < 0)
+        u, v = sources[free], targets[free]
+        if len(u) == 0:
+            break
+        # each node proposes along its edge with the smallest random priority
+        priority = rng.random(len(u))
+        ends = np.r_[u, v]
+        others = np.r_[v, u]
+        order = np.lexsort((np.r_[priority, priority], ends))
+        first = np.r_[True, ends[order][1:] != ends[order][:-1]]
+        proposer, target = ends[order][first], others[order][first]
+        choice = np.full(n, -1, dtype=np.int64)
+        choice[proposer] = target
+        mutual = proposer[(choice[target] == proposer) & (proposer < target)]
+        parent[mutual] = mutual
+        parent[choice[mutual]] = mutual
+    # unmatched nodes join the group of a neighbour, so stars still shrink
+    ends, others = np.r_[sources, targets], np.r_[targets, sources]
+    loose = (parent[ends] < 0) & (parent[others] >= 0)
+    joiner, group = ends[loose], parent[others[loose]]
+    parent[joiner] = group
+    singles = parent < 0
+    parent[singles] = np.flatnonzero(singles)
+    _, coarse = np.unique(parent, return_inverse=True)
+    coarse = coarse.ravel()
+    cu, cv = _undirected(int(coarse.max()) + 1, coarse[sources], coarse[targets])
+    return coarse, cu, cv
+
+
+def force_directed(pos, sources, targets, iterations, movable=None, theta=THETA, temperature=None,
+                   gravity=GRAVITY):
+    """
+    Fruchterman-Reingold iterations with Barnes-Hut repulsion and a linear
+    pull towards the centre of mass. Only nodes flagged in movable are moved.
+    """
+    n = len(pos)
+    k = 1.0 / np.sqrt(n)
+    if temperature is None:
+        temperature = 0.1
+    nodes = np.arange(n) if movable is None else np.flatnonzero(movable)
+    if movable is not None:
+        # forces are only needed on the moving nodes and the edges that touch them
+        touching = movable[sources] | movable[targets]
+        sources, targets = sources[touching], targets[touching]
+    # the step limit shrinks tenfold over the run
+    cooling = 0.1 ** (1.0 / max(iterations, 1))
+    pos = pos.copy()
+    instrumentation.count("layout.iterations", iterations)
+    instrumentation.count("layout.node_iterations", iterations * len(nodes))
+    for _ in range(iterations):
+        disp = np.zeros((n, 2))
+        disp[nodes] = QuadTree(pos).repulsion(pos, k * k, theta, nodes=nodes)
+        delta = pos[sources] - pos[targets]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+        pull = (dist / k)[:, None] * delta
+        for axis in range(2):
+            disp[:, axis] += np.bincount(targets, pull[:, axis], minlength=n) - np.bincount(sources, pull[:, axis], minlength=n)
+        disp = disp[nodes] - gravity * (pos[nodes] - pos.mean(axis=0))
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-12)
+        pos[nodes] += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= cooling
+    return pos
+
+
+def _rescale(pos):
+    # centred on the origin and scaled into [-1, 1], as networkx layouts are
+    pos = pos - pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos / extent if extent > 0 else pos
+
+
+def _connected_layout(n, sources, targets, rng, iterations, theta):
+    # multilevel layout of one block, scaled into [-1, 1]
+    levels = [(n, sources, targets)]
+    parents = []
+    with instrumentation.span("layout.coarsen"):
+        while levels[-1][0] > COARSEST:
+            size, u, v = levels[-1]
+            coarse, cu, cv = coarsen(size, u, v, rng)
+            coarse_size = int(coarse.max()) + 1 if size else 0
+            if coarse_size > 0.9 * size:
+                break
+            parents.append(coarse)
+            levels.append((coarse_size, cu, cv))
+    size, u, v = levels[-1]
+    pos = rng.random((size, 2))
+    coarsest = max(size, 1)
+    with instrumentation.span("layout.level", nodes=size, edges=len(u)):
+        pos = force_directed(pos, u, v, iterations * 4, theta=theta, temperature=0.1)
+    for (size, u, v), coarse in zip(reversed(levels[:-1]), reversed(parents)):
+        scale = 1.0 / np.sqrt(size)
+        pos = pos[coarse] + rng.normal(scale=0.1 * scale, size=(size, 2))
+        steps = max(5, int(iterations * np.sqrt(coarsest / size)))
+        with instrumentation.span("layout.level", nodes=size, edges=len(u)):
+            pos = force_directed(pos, u, v, steps, theta=theta, temperature=2 * scale)
+    return _rescale(pos)
+
+
+def pack(blocks, aspect=ASPECT):
+    """
+    Places laid-out blocks (each an (n_i, 2) array in [-1, 1]) in rows,
+    largest first. Each block gets a square whose area is its node count,
+    so every block is drawn at the same density, and the rows are about
+    aspect times as wide as they are tall. Returns the moved blocks.
+    """
+    sides = np.sqrt([max(len(block), 1) for block in blocks])
+    gap = 1.0
+    width = max(sides.max(), np.sqrt(aspect * ((sides + gap) ** 2).sum()))
+    # rows of block indices, filled left to right
+    rows = [[]]
+    x = 0.0
+    for i in np.argsort(-sides, kind="stable"):
+        if rows[-1] and x + sides[i] > width:
+            rows.append([])
+            x = 0.0
+        rows[-1].append(i)
+        x += sides[i] + gap
+    placed = [None] * len(blocks)
+    y = 0.0
+    for row in rows:
+        # centred rows, each as tall as its first (largest) block
+        x = (width - sides[row].sum() - gap * (len(row) - 1)) / 2
+        for i in row:
+            placed[i] = blocks[i] * sides[i] / 2 + np.array([x + sides[i] / 2, -(y + sides[row[0]] / 2)])
+            x += sides[i] + gap
+        y += sides[row[0]] + gap
+    return placed
+
+
+def multilevel_layout(n, sources, targets, seed=42, iterations=50, theta=THETA):
+    """
+    Layout of an n-node graph given as edge arrays. Every weakly connected
+    component with at least SMALL_COMPONENT nodes is laid out on its own, the
+    smaller ones (isolated papers included) together, and the blocks are
+    packed side by side: laid out together, the small components would be
+    pushed to the rim and the main component squeezed into the middle.
+
+    A block is coarsened by repeated matching, the coarsest graph is laid out
+    from random positions and every finer level starts from its parent's
+    position, so each level needs only a few Barnes-Hut force iterations,
+    fewer the larger it is. Returns an (n, 2) array in [-1, 1].
+    """
+    rng = np.random.default_rng(seed)
+    sources, targets = _undirected(n, np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64))
+    labels = graph_stats.weak_components(n, sources, targets)
+    sizes = np.bincount(labels, minlength=1)
+    # block of every node: its component if large enough, otherwise the shared block
+    large = np.flatnonzero(sizes >= SMALL_COMPONENT)
+    block_of = np.full(len(sizes), len(large))
+    block_of[large] = np.arange(len(large))
+    block = block_of[labels]
+    members = [np.flatnonzero(block == b) for b in range(len(large) + 1)]
+    members = [nodes for nodes in members if len(nodes)]
+    if len(members) == 1:
+        return _connected_layout(n, sources, targets, rng, iterations, theta)
+    local = np.empty(n, dtype=np.int64)
+    edge_block = block[sources]
+    blocks = []
+    for nodes in members:
+        local[nodes] = np.arange(len(nodes))
+        inside = edge_block == block[nodes[0]]
+        blocks.append(_connected_layout(len(nodes), local[sources[inside]], local[targets[inside]],
+                                        rng, iterations, theta))
+    pos = np.zeros((n, 2))
+    for nodes, placed in zip(members, pack(blocks)):
+        pos[nodes] = placed
+    return _rescale(pos)
+
+
+def place_new_nodes(pos, placed, sources, targets, seed=42, iterations=10):
+    """
+    Extends a layout to nodes that have no position yet (placed is False).
+    New nodes start at the mean of their placed neighbours, nodes reached only
+    through other new nodes follow in later rounds, and isolated ones start at
+    random. A few smoothing rounds then move each new node to the mean of all
+    its neighbours, new ones included; placed nodes never move. A force pass
+    with the others held still would push the new nodes out of dense clusters.
+    """
+    rng = np.random.default_rng(seed)
+    pos = np.array(pos, dtype=float)
+    placed = np.array(placed, dtype=bool)
+    movable = ~placed
+    n = len(pos)
+    u, v = _undirected(n, np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64))
+    ends, others = np.r_[u, v], np.r_[v, u]
+    spread = pos[placed].std() if placed.any() else 1.0
+    # new nodes are scattered by about the edge length of the existing layout
+    fixed = placed[u] & placed[v]
+    jitter = np.median(np.sqrt(((pos[u[fixed]] - pos[v[fixed]]) ** 2).sum(axis=1))) / 2 if fixed.any() else 0.01 * spread
+    while not placed.all():
+        usable = ~placed[ends] & placed[others]
+        if not usable.any():
+            missing = ~placed
+            pos[missing] = rng.normal(scale=spread, size=(int(missing.sum()), 2))
+            break
+        total = np.zeros((n, 2))
+        for axis in range(2):
+            total[:, axis] = np.bincount(ends[usable], pos[others[usable], axis], minlength=n)
+        count = np.bincount(ends[usable], minlength=n)
+        ready = count > 0
+        pos[ready] = total[ready] / count[ready, None] + rng.normal(scale=jitter, size=(int(ready.sum()), 2))
+        placed |= ready
+    moving = movable[ends]
+    ends, others = ends[moving], others[moving]
+    count = np.bincount(ends, minlength=n)
+    smooth = np.flatnonzero(count > 0)
+    for _ in range(iterations):
+        total = np.zeros((n, 2))
+        for axis in range(2):
+            total[:, axis] = np.bincount(ends, pos[others, axis], minlength=n)
+        pos[smooth] = total[smooth] / count[smooth, None] + rng.normal(scale=jitter, size=(len(smooth), 2))
+    return pos
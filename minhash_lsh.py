@@ -0,0 +1,222 @@
+import os
+import time
+import numpy as np
+import graph_store
+
+# Universal hashing h(x) = (a * x + b) mod p with a Mersenne prime that keeps
+# a * x inside int64 for 31-bit node indices
+_PRIME = (1 << 31) - 1
+_EMPTY = np.int64(_PRIME)
+
+NUM_HASHES = 128
+BANDS = 32
+MAX_BUCKET = 500
+# Candidates (as a multiple of k) whose estimated overlap is replaced by the exact one
+RERANK = 10
+# Hash values computed at once while building signatures (edges x hashes)
+CHUNK_ENTRIES = 32 * 1024 * 1024
+
+
+def minhash_signatures(indptr, indices, num_hashes=NUM_HASHES, seed=42):
+    """
+    MinHash signature of every row of a CSR adjacency: sig[i, h] is the smallest
+    hash h over the neighbours of i. Rows without neighbours get _PRIME everywhere.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_hashes, dtype=np.int64)
+    b = rng.integers(0, _PRIME, size=num_hashes, dtype=np.int64)
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    n = len(indptr) - 1
+    sig = np.full((n, num_hashes), _EMPTY, dtype=np.int64)
+    degrees = np.diff(indptr)
+    edges_per_chunk = max(1, CHUNK_ENTRIES // num_hashes)
+    start = 0
+    while start < n:
+        # grow the chunk until it holds about CHUNK_ENTRIES hash values
+        stop = int(np.searchsorted(indptr, indptr[start] + edges_per_chunk, side="right")) - 1
+        stop = min(max(stop, start + 1), n)
+        lo, hi = indptr[start], indptr[stop]
+        if hi > lo:
+            hashed = (indices[lo:hi, None] * a + b) % _PRIME
+            rows = np.flatnonzero(degrees[start:stop]) + start
+            sig[rows] = np.minimum.reduceat(hashed, indptr[rows] - lo, axis=0)
+        start = stop
+    return sig
+
+
+class MinHashIndex:
+    """
+    LSH index over MinHash signatures of the successor sets (references,
+    matching bibliographic coupling) or predecessor sets (citing papers,
+    matching co-citation) of every paper.
+
+    The signature is split into `bands` bands; two papers become candidates
+    when any band matches exactly. More bands with fewer rows each raise recall
+    at the cost of more candidates; buckets larger than max_bucket are skipped
+    to keep the candidate set bounded. Precision is set by `rerank`: the best
+    rerank * k candidates get their exact overlap before the final top-k.
+    """
+
+    def __init__(self, store, direction="successors", num_hashes=NUM_HASHES, bands=BANDS,
+                 max_bucket=MAX_BUCKET, seed=42):
+        if num_hashes % bands:
+            raise ValueError("num_hashes must be a multiple of bands")
+        if direction == "successors":
+            indptr, indices = store.indptr, store.indices
+        elif direction == "predecessors":
+            indptr, indices = store.rev_indptr, store.rev_indices
+        else:
+            raise ValueError(f"Unknown direction '{direction}'")
+        self.store = store
+        self.direction = direction
+        self.bands = bands
+        self.rows = num_hashes // bands
+        self.max_bucket = max_bucket
+        self.neighbours = (np.asarray(indptr), np.asarray(indices))
+        self.set_sizes = np.diff(self.neighbours[0])
+        self.signatures = minhash_signatures(indptr, indices, num_hashes, seed)
+        self._build_buckets()
+
+    def _build_buckets(self):
+        # per band: bucket id of every node, plus the nodes sorted by bucket
+        n = self.store.num_nodes
+        nonempty = np.flatnonzero(self.set_sizes > 0)
+        # band rows are folded into one 64-bit key; a collision only adds a candidate
+        multipliers = np.random.default_rng(7).integers(1, 1 << 62, size=self.rows, dtype=np.int64).astype(np.uint64)
+        self.bucket_of = np.full((self.bands, n), -1, dtype=np.int64)
+        self.bucket_members = []
+        self.bucket_starts = []
+        for band in range(self.bands):
+            cols = self.signatures[nonempty, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+            keys = (cols * multipliers).sum(axis=1)
+            _, inverse = np.unique(keys, return_inverse=True)
+            self.bucket_of[band, nonempty] = inverse
+            order = np.argsort(inverse, kind="stable")
+            self.bucket_members.append(nonempty[order])
+            num_buckets = int(inverse.max()) + 1 if len(inverse) else 0
+            self.bucket_starts.append(np.searchsorted(inverse[order], np.arange(num_buckets + 1)))
+
+    def candidate_pairs(self):
+        """Unordered candidate pairs (i < j) sharing at least one band bucket."""
+        n = self.store.num_nodes
+        found = []
+        for band in range(self.bands):
+            members, starts = self.bucket_members[band], self.bucket_starts[band]
+            sizes = np.diff(starts)
+            eligible = (sizes > 1) & (sizes <= self.max_bucket)
+            # every position pairs with the positions after it in the same bucket
+            bucket_end = np.repeat(starts[1:], sizes)
+            positions = np.flatnonzero(np.repeat(eligible, sizes))
+            partners = bucket_end[positions] - positions - 1
+            left = np.repeat(positions, partners)
+            offsets = np.arange(len(left)) - np.repeat(np.cumsum(partners) - partners, partners)
+            right = left + 1 + offsets
+            a, b = members[left], members[right]
+            found.append(np.minimum(a, b) * n + np.maximum(a, b))
+        keys = np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+        return keys // n, keys % n
+
+    def estimate(self, rows, cols, score="overlap"):
+        """
+        Estimated Jaccard similarity of the pairs, or with score="overlap" the
+        estimated number of shared neighbours (the ex_2 score).
+        """
+        jaccard = np.empty(len(rows))
+        step = max(1, CHUNK_ENTRIES // self.signatures.shape[1])
+        for lo in range(0, len(rows), step):
+            a, b = rows[lo:lo + step], cols[lo:lo + step]
+            jaccard[lo:lo + step] = (self.signatures[a] == self.signatures[b]).mean(axis=1)
+        if score == "jaccard":
+            return jaccard
+        return jaccard / (1 + jaccard) * (self.set_sizes[rows] + self.set_sizes[cols])
+
+    def exact_overlap(self, rows, cols):
+        """Exact number of shared neighbours of the pairs."""
+        indptr, indices = self.neighbours
+        return np.array([len(np.intersect1d(indices[indptr[a]:indptr[a + 1]], indices[indptr[b]:indptr[b + 1]],
+                                            assume_unique=True)) for a, b in zip(rows, cols)], dtype=float)
+
+    def _rank(self, rows, cols, k, score, rerank):
+        est = self.estimate(rows, cols, score)
+        best = np.argsort(-est, kind="stable")[:k * rerank if rerank else k]
+        if rerank and score == "overlap":
+            # exact scores for the best rerank * k candidates trade time for precision
+            est = est.copy()
+            est[best] = self.exact_overlap(rows[best], cols[best])
+            best = best[np.argsort(-est[best], kind="stable")]
+        return best[:k], est
+
+    def top_pairs(self, k=10, score="overlap", rerank=RERANK):
+        """Approximate all-pairs top-k as [((id a, id b), score), ...]."""
+        rows, cols = self.candidate_pairs()
+        best, est = self._rank(rows, cols, k, score, rerank)
+        ids = self.store.node_id
+        return [((ids(int(rows[i])), ids(int(cols[i]))), float(est[i])) for i in best]
+
+    def query(self, node_id, k=10, score="overlap", rerank=RERANK):
+        """Approximate top-k papers most similar to one paper, as [(id, estimate), ...]."""
+        i = self.store.index_of(node_id)
+        found = []
+        for band in range(self.bands):
+            bucket = self.bucket_of[band, i]
+            if bucket < 0:
+                continue
+            starts = self.bucket_starts[band]
+            found.append(self.bucket_members[band][starts[bucket]:starts[bucket + 1]])
+        if not found:
+            return []
+        others = np.unique(np.concatenate(found))
+        others = others[others != i]
+        best, est = self._rank(np.full(len(others), i), others, k, score, rerank)
+        return [(self.store.node_id(int(others[j])), float(est[j])) for j in best]
+
+
+def benchmark_recall(G, k=10, configs=((128, 32), (128, 64)), workers=None):
+    """
+    Recall of the LSH top-k against the exact ex_2 results for both measures,
+    for a few (num_hashes, bands) settings. Candidate recall is the share of the
+    exact top-k pairs that LSH proposes at all; top-k recall counts the returned
+    pairs whose exact score reaches the exact k-th score, so ties are not penalized.
+    """
+    import ex_2
+    store = G.store
+    exact = {
+        "co_citation": ex_2.compute_co_citation(G, k, workers),
+        "bibliographic_coupling": ex_2.compute_bibliographic_coupling(G, k, workers),
+    }
+    directions = {"co_citation": "predecessors", "bibliographic_coupling": "successors"}
+    results = []
+    for measure, pairs in exact.items():
+        truth_idx = [(store.index_of(a), store.index_of(b)) for (a, b), _ in pairs]
+        kth_score = pairs[-1][1]
+        for num_hashes, bands in configs:
+            start = time.time()
+            index = MinHashIndex(store, directions[measure], num_hashes, bands)
+            rows, cols = index.candidate_pairs()
+            approx = index.top_pairs(k)
+            elapsed = time.time() - start
+            candidates = set(zip(rows.tolist(), cols.tolist()))
+            candidate_recall = sum((min(a, b), max(a, b)) in candidates for a, b in truth_idx) / len(pairs)
+            approx_rows = [store.index_of(a) for (a, _), _ in approx]
+            approx_cols = [store.index_of(b) for (_, b), _ in approx]
+            exact_scores = index.exact_overlap(approx_rows, approx_cols)
+            recall = min(len(pairs), int((exact_scores >= kth_score).sum())) / len(pairs)
+            results.append({"measure": measure, "num_hashes": num_hashes, "bands": bands,
+                            "candidates": len(rows), "candidate_recall": candidate_recall,
+                            "recall": recall, "seconds": elapsed})
+            print(f"{measure:<24} hashes={num_hashes:<4} bands={bands:<3} candidates={len(rows):<10,} "
+                  f"candidate recall={candidate_recall:.2f} top-{k} recall={recall:.2f} ({elapsed:.2f}s)")
+    return results
+
+
+def main():
+    base = os.path.dirname(__file__)
+    gpath = os.path.join(base, graph_store.STORE_PATH)
+    G = graph_store.load_graph(gpath)
+    print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+    benchmark_recall(G)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import sys
+import time
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import networkx as nx
+import graph_store
+import graph_stats
+import instrumentation
+from pagerank_engine import PageRankEngine
+
+METHODS = ("power", "gauss_seidel", "aitken", "quadratic", "gmres", "bicgstab")
+# Below this damping factor power iteration converges quickly enough on its own
+ACCELERATE_FROM = 0.7
+# Power iterations between two extrapolation steps
+EXTRAPOLATE_EVERY = 10
+GMRES_RESTART = 30
+# Share of citations between strong components from which Gauss-Seidel is picked
+ACYCLIC_SHARE = 0.99
+# Products BiCGSTAB spends beyond its convergence rate (start residual, last half step)
+KRYLOV_OVERHEAD = 3
+
+
+def choose_method(alpha, between=1.0, residuals=(), threshold=None):
+    """
+    Solver picked by method="auto" for a damping factor and the share of
+    citations between strong components. Gauss-Seidel in citation order
+    carries rank along whole citation chains in one sweep, so on a citation
+    graph without cycles it needs a handful of sweeps at any alpha. Once
+    cycles join many papers, BiCGSTAB needs the fewest products, unless the
+    stopping threshold n * tol is loose or the start is already close. Given
+    the residuals of the power iterations run so far and that threshold,
+    power iteration is kept while their last rate says it finishes first.
+    """
+    if alpha < ACCELERATE_FROM:
+        return "power"
+    if between >= ACYCLIC_SHARE:
+        return "gauss_seidel"
+    if threshold is None:
+        return "bicgstab"
+    if len(residuals) < 2 or residuals[-1] < threshold:
+        return "power"
+    rate = residuals[-1] / residuals[-2]
+    if not 0 < rate < 1:
+        return "bicgstab"
+    reduction = np.log(threshold / residuals[-1])
+    # a Krylov method contracts roughly like 1 - sqrt(1 - rate) per product
+    krylov = reduction / np.log(1 - np.sqrt(1 - rate)) + KRYLOV_OVERHEAD
+    return "power" if reduction / np.log(rate) <= krylov else "bicgstab"
+
+
+class PageRankSolver:
+    """
+    PageRank by several solvers over the transition matrix of a PageRankEngine.
+    Every solver stops once the L1 residual of the PageRank equation drops
+    below n * tol, the test nx.pagerank applies to the change between two
+    power iterations, so the scores agree with networkx within its tolerance.
+
+    PageRank with personalization p under the networkx dangling convention is
+    x = y / |y| for the solution of the linear system (I - alpha P^T) y = p;
+    the Gauss-Seidel and Krylov solvers work on that system.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.n = engine.n
+        self._layers = None
+
+    def layers(self):
+        """
+        The papers sorted by the layer of their strong component in the
+        condensation DAG (citing papers first), the bounds of every layer in
+        that order, and the share of the citations between layers.
+        """
+        if self._layers is None:
+            store = self.engine.store
+            layer = graph_stats.condensation_layers(store)
+            order = np.argsort(layer, kind="stable")
+            bounds = np.searchsorted(layer[order], np.arange(int(layer.max(initial=-1)) + 2))
+            sources = store.edge_sources()
+            between = (layer[sources] != layer[np.asarray(store.indices)]).mean() if store.num_edges else 1.0
+            self._layers = (order, bounds, float(between))
+        return self._layers
+
+    def _system(self, alpha):
+        return sp.identity(self.n, format="csr") - alpha * self.engine.PT
+
+    def _start(self, x0):
+        if x0 is None:
+            return np.full(self.n, 1.0 / self.n)
+        x = np.asarray(x0, dtype=float)
+        return x / x.sum()
+
+    def _scale(self, x, alpha):
+        # y = x |y| with |y| = 1 / (1 - alpha + alpha * dangling mass of x)
+        return x / (1 - alpha + alpha * x[self.engine.dangling].sum())
+
+    def _probe(self, alpha, p, x0, tol, max_iter, between):
+        # power iterations for as long as choose_method expects them to finish first
+        x = self._start(x0)
+        residuals = []
+        while len(residuals) < max_iter:
+            x_new = self.engine.step(x, p, alpha)
+            residuals.append(float(np.abs(x_new - x).sum()))
+            x = x_new
+            if residuals[-1] < self.n * tol:
+                return x, residuals, True
+            if choose_method(alpha, between, residuals, self.n * tol) != "power":
+                return x, residuals, False
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    def power(self, alpha, p, x0=None, tol=1.0e-6, max_iter=1000, extrapolation=None, every=EXTRAPOLATE_EVERY):
+        """
+        Power iteration, as nx.pagerank, optionally with "aitken" or
+        "quadratic" extrapolation from the last iterates every few steps.
+        Aitken extrapolation is kept for comparison only: it assumes a single
+        real eigenvalue behind the error, which citation graphs do not have,
+        and it costs more products than plain power iteration (see _aitken).
+        """
+        x = self._start(x0)
+        residuals = []
+        recent = [x]
+        for iteration in range(max_iter):
+            x_new = self.engine.step(x, p, alpha)
+            # for the normalized iterate this is also the L1 residual of the linear system
+            residuals.append(float(np.abs(x_new - x).sum()))
+            x = x_new
+            if residuals[-1] < self.n * tol:
+                return x, residuals, iteration + 1
+            recent = recent[-3:] + [x]
+            if extrapolation and (iteration + 1) % every == 0 and len(recent) == 4:
+                x = _aitken(*recent[-3:]) if extrapolation == "aitken" else _quadratic(*recent)
+                recent = [x]
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    def gauss_seidel(self, alpha, p, x0=None, tol=1.0e-6, max_iter=1000):
+        """
+        Block Gauss-Seidel over y = alpha P^T y + p, one layer of the
+        condensation at a time in citation order: a layer is updated from the
+        new ranks of every earlier layer (Jacobi-style within the layer), so
+        on an acyclic citation graph a single sweep is exact. One sweep
+        touches every entry once, like a matrix-vector product; the residual
+        needs only the entries inside a layer, counted as a fraction of one.
+        """
+        order, bounds, _ = self.layers()
+        PT = self.engine.PT[order][:, order].tocsr()
+        blocks = [PT[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+        # entries whose citing paper is in the same layer (the rest are below the diagonal)
+        layer = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+        coo = PT.tocoo()
+        inside = layer[coo.row] == layer[coo.col]
+        within = sp.csr_matrix((coo.data[inside], (coo.row[inside], coo.col[inside])), shape=PT.shape)
+        b = p[order]
+        y = self._scale(self._start(x0), alpha)[order]
+        residuals = []
+        for iteration in range(max_iter):
+            y_last = y.copy()
+            for (lo, hi), block in zip(zip(bounds[:-1], bounds[1:]), blocks):
+                y[lo:hi] = b[lo:hi] + alpha * (block @ y)
+            # y - alpha P^T y - p: only entries inside a layer saw an old value during the sweep
+            residuals.append(float(alpha * np.abs(within @ (y - y_last)).sum() / y.sum()))
+            if residuals[-1] < self.n * tol:
+                x = np.empty(self.n)
+                x[order] = y / y.sum()
+                matvecs = (iteration + 1) * (1 + within.nnz / max(PT.nnz, 1))
+                return x, residuals, round(matvecs, 2)
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    def bicgstab(self, alpha, p, x0=None, tol=1.0e-6, max_iter=1000):
+        """BiCGSTAB on (I - alpha P^T) y = p, two matrix-vector products per iteration."""
+        A = self._system(alpha)
+        y = self._scale(self._start(x0), alpha)
+        r = p - A @ y
+        r_hat = r.copy()
+        rho = step = omega = 1.0
+        v = direction = np.zeros(self.n)
+        residuals = []
+        matvecs = 1
+        for _ in range(max_iter):
+            rho_next = r_hat @ r
+            if rho_next == 0:
+                # breakdown: restart the shadow residual
+                r_hat = r.copy()
+                rho_next = r_hat @ r
+            direction = r + (rho_next / rho) * (step / omega) * (direction - omega * v)
+            v = A @ direction
+            step = rho_next / (r_hat @ v)
+            s = r - step * v
+            t = A @ s
+            matvecs += 2
+            omega = (t @ s) / (t @ t) if t @ t > 0 else 0.0
+            y = y + step * direction + omega * s
+            r = s - omega * t
+            rho = rho_next
+            residuals.append(float(np.abs(r).sum() / y.sum()))
+            if residuals[-1] < self.n * tol:
+                return np.maximum(y, 0) / np.maximum(y, 0).sum(), residuals, matvecs
+            if omega == 0:
+                break
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    def gmres(self, alpha, p, x0=None, tol=1.0e-6, max_iter=1000, restart=GMRES_RESTART):
+        """
+        Restarted GMRES on (I - alpha P^T) y = p through scipy. GMRES tracks
+        the 2-norm of the residual; sqrt(n) times it bounds the L1 residual,
+        and that bound is what is reported and tested.
+        """
+        A = self._system(alpha)
+        matvecs = [0]
+
+        def matvec(y):
+            matvecs[0] += 1
+            return A @ np.ravel(y)
+
+        residuals = []
+        scale = np.sqrt(self.n) * np.linalg.norm(p)
+        y0 = self._scale(self._start(x0), alpha)
+        # |y| >= |p| = 1, so the bound holds for the relative residual as well
+        y, info = spla.gmres(spla.LinearOperator((self.n, self.n), matvec=matvec, dtype=float), p, x0=y0,
+                             rtol=0, atol=self.n * tol / np.sqrt(self.n), restart=restart,
+                             maxiter=max(1, max_iter // restart),
+                             callback=lambda norm: residuals.append(float(norm * scale)),
+                             callback_type="pr_norm")
+        if info != 0:
+            raise nx.PowerIterationFailedConvergence(max_iter)
+        y = np.maximum(y, 0)
+        return y / y.sum(), residuals, matvecs[0]
+
+    def solve(self, alpha=0.85, personalization=None, method="auto", x0=None, tol=1.0e-6, max_iter=1000):
+        """
+        PageRank of one personalization vector by the given method, or the one
+        choose_method picks for alpha and tol. Returns (scores, report) where
+        report has the method, the residual of every iteration and the number
+        of matrix-vector products spent. Where "auto" would pick BiCGSTAB it
+        runs power iterations until choose_method expects BiCGSTAB to finish
+        first; the method then reads "power+bicgstab" and the report counts both.
+        """
+        if method != "auto" and method not in METHODS:
+            raise ValueError(f"Unknown method '{method}'")
+        p = self.engine._normalize(personalization)[:, 0]
+        probe = []
+        if method == "auto":
+            between = self.layers()[2]
+            method = choose_method(alpha, between)
+            if method == "bicgstab":
+                x0, probe, converged = self._probe(alpha, p, x0, tol, max_iter, between)
+                method = "power" if converged else "power+bicgstab"
+        with instrumentation.span("pagerank.solve", method=method, alpha=float(alpha)):
+            if probe and method == "power":
+                x, residuals, matvecs = x0, [], 0
+            elif probe:
+                x, residuals, matvecs = self.bicgstab(alpha, p, x0, tol, max_iter - len(probe))
+            elif method in ("power", "aitken", "quadratic"):
+                x, residuals, matvecs = self.power(alpha, p, x0, tol, max_iter,
+                                                   extrapolation=None if method == "power" else method)
+            else:
+                x, residuals, matvecs = getattr(self, method)(alpha, p, x0, tol, max_iter)
+            residuals = probe + residuals
+            matvecs += len(probe)
+            instrumentation.count("pagerank.matvecs", matvecs)
+            for residual in residuals:
+                instrumentation.record("pagerank.residual", residual)
+        return x, {"method": method, "iterations": len(residuals), "matvecs": matvecs, "residuals": residuals}
+
+    def sweep(self, alphas, personalization=None, method="auto", tol=1.0e-6, max_iter=1000):
+        """
+        PageRank for a sequence of damping factors, each warm-started from the
+        previous solution. Returns an (n_alphas, n) array and the reports.
+        """
+        results = np.empty((len(alphas), self.n))
+        reports = []
+        x = None
+        for row, alpha in enumerate(alphas):
+            x, report = self.solve(alpha, personalization, method, x0=x, tol=tol, max_iter=max_iter)
+            results[row] = x
+            reports.append(report)
+        return results, reports
+
+
+def _aitken(x0, x1, x2):
+    # componentwise Aitken delta-squared, left alone where the differences vanish.
+    # It does not pay off on citation graphs: with 1% of the citations reversed
+    # and tol 1e-10 it needs 68/165/806 products at alpha 0.85/0.95/0.99 against
+    # 41/127/557 for power iteration. Applying it only once the residual ratio
+    # has settled, or only once, still loses at 0.85 and 0.95, so "auto" never
+    # picks it; use "quadratic" or the linear-system solvers instead.
+    g = x1 - x0
+    h = x2 - 2 * x1 + x0
+    safe = np.abs(h) > 1e-15
+    x = x2.copy()
+    x[safe] = x0[safe] - g[safe] ** 2 / h[safe]
+    x = np.maximum(x, 0)
+    return x / x.sum()
+
+
+def _quadratic(x0, x1, x2, x3):
+    # quadratic extrapolation (Kamvar et al.): drop the second and third
+    # eigenvector components from the last four iterates
+    Y = np.stack([x1 - x0, x2 - x0], axis=1)
+    (g1, g2), *_ = np.linalg.lstsq(Y, -(x3 - x0), rcond=None)
+    x = (g1 + g2 + 1) * x1 + (g2 + 1) * x2 + x3
+    x = np.maximum(x, 0)
+    return x / x.sum()
+
+
+def compare(G, alphas=(0.5, 0.85, 0.9, 0.95, 0.99), tol=1.0e-10):
+    """
+    Matrix-vector products, time and L1 distance to a tightly converged
+    nx.pagerank for every method and alpha.
+    """
+    engine = PageRankEngine(G.store)
+    solver = PageRankSolver(engine)
+    nx_graph = G.to_networkx()
+    print(f"{'alpha':<6} {'method':<13} {'matvecs':>8} {'seconds':>8} {'L1 vs nx':>10}")
+    for alpha in alphas:
+        exact = nx.pagerank(nx_graph, alpha=alpha, tol=1.0e-12, max_iter=100000)
+        exact = np.array([exact[G.store.node_id(i)] for i in range(G.store.num_nodes)])
+        for method in METHODS:
+            start = time.time()
+            try:
+                x, report = solver.solve(alpha, method=method, tol=tol, max_iter=100000)
+            except nx.PowerIterationFailedConvergence:
+                print(f"{alpha:<6} {method:<13} did not converge")
+                continue
+            print(f"{alpha:<6} {method:<13} {report['matvecs']:>8g} {time.time() - start:>8.3f} "
+                  f"{np.abs(x - exact).sum():>10.2e}")
+
+
+def main():
+    G = graph_store.load_graph(sys.argv[1] if len(sys.argv) > 1 else graph_store.STORE_PATH)
+    compare(G)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import os
+import json
+import asyncio
+import argparse
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import networkx as nx
+import graph_store
+import graph_stats
+import instrumentation
+import ex_2
+from pagerank_engine import PageRankEngine, top_k
+from title_index import TitleIndex
+from topic_pagerank import DAMPING_FACTOR
+
+HOST = "127.0.0.1"
+PORT = 8765
+# Finished (and in-flight) results kept for repeated queries
+CACHE_SIZE = 256
+# PageRank queries arriving within this many seconds share one block solve
+BATCH_WINDOW = 0.01
+# Personalization columns solved together at most
+MAX_BATCH = 64
+DEFAULT_K = 10
+MAX_K = 1000
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+# the graph, PageRank engine and title index of a worker process
+_worker = None
+
+
+def _init_worker(store_path):
+    global _worker
+    G = graph_store.load_graph(store_path)
+    _worker = (G, PageRankEngine(G.store), TitleIndex(G.store))
+
+
+def _ranked(store, nodes, scores):
+    return [{"id": store.node_id(int(i)), "title": store.title(int(i)), "score": float(s)}
+            for i, s in zip(nodes, scores)]
+
+
+def _solve(alpha, queries, k):
+    """
+    PageRank for a batch of queries at one alpha in a single block solve.
+    A query is None for global PageRank or a title query for topic-sensitive
+    PageRank. Returns the top-k papers per query, None when a topic matches
+    no paper. Non-convergence is raised as a ValueError, since the networkx
+    exception does not survive the trip back from the worker.
+    """
+    G, engine, index = _worker
+    store = G.store
+    columns = []
+    for query in queries:
+        if query is None:
+            columns.append(np.full(store.num_nodes, 1.0 / store.num_nodes))
+            continue
+        docs = index.search(query)
+        if len(docs):
+            p = np.zeros(store.num_nodes)
+            p[docs] = 1 / len(docs)
+            columns.append(p)
+        else:
+            columns.append(None)
+    solved = [j for j, p in enumerate(columns) if p is not None]
+    results = [None] * len(queries)
+    if solved:
+        try:
+            X = engine.pagerank(alpha=alpha, personalization=np.stack([columns[j] for j in solved], axis=1))
+        except nx.PowerIterationFailedConvergence:
+            raise ValueError(f"PageRank did not converge at alpha {alpha}; try a smaller alpha") from None
+        for col, j in enumerate(solved):
+            best = top_k(X[:, col], k)
+            results[j] = _ranked(store, best, X[best, col])
+    return results
+
+
+def _similar(paper_id, measure, k):
+    G = _worker[0]
+    store = G.store
+    pairs = ex_2.similar_papers(G, paper_id, measure, k)
+    return [{"id": pid, "title": store.title(store.index_of(pid)), "score": score} for pid, score in pairs]
+
+
+def _statistics():
+    return graph_stats.load_statistics(_worker[0].store)
+
+
+_REQUIRED = object()
+
+
+def _param(params, name, kind=str, default=_REQUIRED):
+    if name not in params:
+        if default is _REQUIRED:
+            raise ValueError(f"Missing parameter '{name}'")
+        return default
+    try:
+        return kind(params[name])
+    except ValueError:
+        raise ValueError(f"Invalid value for '{name}': {params[name]!r}")
+
+
+class QueryService:
+    """
+    Answers PageRank, topic, similarity and statistics queries over one graph
+    store kept resident in a pool of worker processes. Results are cached by
+    graph fingerprint and parameters, and PageRank queries arriving together
+    are solved as the columns of one block.
+    """
+
+    def __init__(self, store_path=graph_store.STORE_PATH, workers=None, cache_size=CACHE_SIZE,
+                 batch_window=BATCH_WINDOW):
+        self.store = graph_store.CSRGraph(store_path)
+        # built here once, so the workers do not race to build it
+        TitleIndex(self.store)
+        # forking next to the executor's own threads can copy a held lock into the worker
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker, initargs=(store_path,))
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        # alpha -> [(query, k, future), ...] waiting for the next solve
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def _run(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _cached(self, key, compute):
+        # in-flight results are cached too, so identical concurrent queries run once
+        key = (self.store.fingerprint,) + key
+        task = self.cache.get(key)
+        if task is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            instrumentation.count("service.cache_hits")
+        else:
+            self.misses += 1
+            instrumentation.count("service.cache_misses")
+            task = asyncio.ensure_future(compute())
+            self.cache[key] = task
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        try:
+            # a client hanging up does not cancel the work others wait on
+            return await asyncio.shield(task)
+        except Exception:
+            if self.cache.get(key) is task:
+                del self.cache[key]
+            raise
+
+    async def _pagerank(self, alpha, query, k):
+        future = asyncio.get_running_loop().create_future()
+        batch = self.pending.setdefault(alpha, [])
+        batch.append((query, k, future))
+        if len(batch) == 1:
+            asyncio.get_running_loop().call_later(self.batch_window, self._flush, alpha)
+        elif len(batch) >= MAX_BATCH:
+            self._flush(alpha)
+        return await future
+
+    def _flush(self, alpha):
+        batch = self.pending.pop(alpha, None)
+        if batch:
+            asyncio.ensure_future(self._solve_batch(alpha, batch))
+
+    async def _solve_batch(self, alpha, batch):
+        self.batches += 1
+        instrumentation.count("service.batches")
+        instrumentation.count("service.batched_queries", len(batch))
+        try:
+            results = await self._run(_solve, alpha, [query for query, _, _ in batch],
+                                      max(k for _, k, _ in batch))
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, k, future), ranked in zip(batch, results):
+            if not future.done():
+                future.set_result(ranked[:k] if ranked is not None else None)
+
+    async def pagerank(self, alpha=DAMPING_FACTOR, k=DEFAULT_K):
+        return await self._cached(("pagerank", alpha, k), lambda: self._pagerank(alpha, None, k))
+
+    async def topic(self, query, alpha=DAMPING_FACTOR, k=DEFAULT_K):
+        ranked = await self._cached(("topic", query, alpha, k), lambda: self._pagerank(alpha, query, k))
+        if ranked is None:
+            raise KeyError(f"No papers found for topic '{query}'")
+        return ranked
+
+    async def similar(self, paper_id, measure="co_citation", k=DEFAULT_K):
+        if measure not in ("co_citation", "bibliographic_coupling"):
+            raise ValueError(f"Unknown measure '{measure}'")
+        self.store.index_of(paper_id)
+        return await self._cached(("similar", paper_id, measure, k), lambda: self._run(_similar, paper_id, measure, k))
+
+    async def statistics(self):
+        stats = await self._cached(("stats",), lambda: self._run(_statistics))
+        service = {"cache_entries": len(self.cache), "cache_hits": self.hits, "cache_misses": self.misses,
+                   "pagerank_batches": self.batches}
+        return {**stats, "service": service}
+
+    async def dispatch(self, method, target):
+        """Answers one request; returns (status, JSON-serializable body)."""
+        if method != "GET":
+            return 405, {"error": f"Method {method} not allowed"}
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            k = _param(params, "k", int, DEFAULT_K)
+            alpha = _param(params, "alpha", float, DAMPING_FACTOR)
+            if not 1 <= k <= MAX_K:
+                raise ValueError(f"k must be between 1 and {MAX_K}")
+            if not 0 < alpha < 1:
+                raise ValueError("alpha must be between 0 and 1")
+            # spans nest on one stack, so interleaved requests are only counted
+            instrumentation.count("service.requests")
+            if url.path == "/pagerank":
+                return 200, {"alpha": alpha, "results": await self.pagerank(alpha, k)}
+            if url.path == "/topic":
+                query = _param(params, "q")
+                return 200, {"query": query, "alpha": alpha, "results": await self.topic(query, alpha, k)}
+            if url.path == "/similar":
+                paper_id = _param(params, "id")
+                measure = _param(params, "measure", str, "co_citation")
+                return 200, {"id": paper_id, "measure": measure,
+                             "results": await self.similar(paper_id, measure, k)}
+            if url.path == "/stats":
+                return 200, await self.statistics()
+            return 404, {"error": f"Unknown endpoint '{url.path}'"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except KeyError as e:
+            return 404, {"error": f"Not found: {e.args[0]}"}
+
+    async def handle(self, reader, writer):
+        # one request per connection, answered with JSON
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.split()
+            if len(parts) != 3:
+                status, body = 400, {"error": "Malformed request line"}
+            else:
+                status, body = await self.dispatch(parts[0], parts[1])
+        except Exception as e:
+            status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+        payload = json.dumps(body).encode()
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def serve(store_path=graph_store.STORE_PATH, host=HOST, port=PORT, workers=None):
+    service = QueryService(store_path, workers)
+    try:
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"Serving {service.store.num_nodes:,} papers from '{store_path}' on http://{host}:{port}")
+        print("Endpoints: /pagerank?alpha=&k=  /topic?q=&alpha=&k=  /similar?id=&measure=&k=  /stats")
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP service answering queries on a resident graph")
+    parser.add_argument("--store", default=graph_store.STORE_PATH)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.store, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        print("Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib import colormaps
+from scipy.stats import rankdata
+
+# Line samples accumulated at once (bounds the memory of the edge pass)
+SAMPLE_CHUNK = 1 << 22
+# Pixels left blank around the drawing
+MARGIN = 20
+# Radius in pixels of the highest-ranked nodes
+MAX_RADIUS = 4
+# Nodes ranked below this fraction are drawn as single pixels
+SIZED_FROM = 0.9
+
+
+def to_pixels(pos, width, height, margin=MARGIN):
+    """Maps positions onto pixel (column, row) coordinates, keeping the aspect ratio and y pointing up."""
+    lo = pos.min(axis=0)
+    extent = np.maximum(pos.max(axis=0) - lo, 1e-12)
+    scale = min((width - 2 * margin - 1) / extent[0], (height - 2 * margin - 1) / extent[1])
+    offset = (np.array([width, height]) - 1 - extent * scale) / 2
+    px = (pos - lo) * scale + offset
+    px[:, 1] = height - 1 - px[:, 1]
+    return px
+
+
+def edge_density(px, sources, targets, width, height, chunk=SAMPLE_CHUNK):
+    """
+    Number of edges crossing every pixel. Each edge is sampled once per pixel
+    step along its longer axis (a DDA line), and the samples of a chunk of
+    edges are counted with one bincount.
+    """
+    density = np.zeros(width * height)
+    steps = np.ceil(np.abs(px[targets] - px[sources]).max(axis=1)).astype(np.int64) + 1
+    ends = np.cumsum(steps)
+    lo = 0
+    while lo < len(steps):
+        # as many edges as fit in the chunk, but at least one
+        hi = max(int(np.searchsorted(ends, ends[lo] - steps[lo] + chunk, side="right")), lo + 1)
+        count = steps[lo:hi]
+        total = int(count.sum())
+        edge = np.repeat(np.arange(lo, hi), count)
+        # position of every sample along its edge, 0 at the source and 1 at the target
+        t = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+        t = t / np.maximum(np.repeat(count, count) - 1, 1)
+        a, b = px[sources[edge]], px[targets[edge]]
+        x = np.rint(a[:, 0] + (b[:, 0] - a[:, 0]) * t).astype(np.int64)
+        y = np.rint(a[:, 1] + (b[:, 1] - a[:, 1]) * t).astype(np.int64)
+        density += np.bincount(y * width + x, minlength=width * height)
+        lo = hi
+    return density.reshape(height, width)
+
+
+def shade(density, mode="log"):
+    """Scales a density buffer into [0, 1] by log or histogram equalization."""
+    if mode == "log":
+        shaded = np.log1p(density)
+        top = shaded.max()
+        return shaded / top if top > 0 else shaded
+    if mode == "equalize":
+        # every non-empty pixel gets the fraction of non-empty pixels at or below its density
+        shaded = np.zeros(density.shape)
+        filled = density > 0
+        values, inverse, counts = np.unique(density[filled], return_inverse=True, return_counts=True)
+        shaded[filled] = (np.cumsum(counts) / counts.sum())[inverse.ravel()]
+        return shaded
+    raise ValueError(f"Unknown shading mode '{mode}'")
+
+
+def node_layer(px, rank, width, height, max_radius=MAX_RADIUS, sized_from=SIZED_FROM):
+    """
+    Highest node rank (0 to 1) covering every pixel, NaN where there is no
+    node. The top-ranked nodes are discs whose radius grows with their rank.
+    """
+    layer = np.full(width * height, -np.inf)
+    radius = np.ceil(np.maximum(rank - sized_from, 0) / (1 - sized_from) * max_radius).astype(np.int64)
+    cx, cy = np.rint(px[:, 0]).astype(np.int64), np.rint(px[:, 1]).astype(np.int64)
+    for dy in range(-max_radius, max_radius + 1):
+        for dx in range(-max_radius, max_radius + 1):
+            inside = dx * dx + dy * dy <= radius * radius
+            x, y = cx[inside] + dx, cy[inside] + dy
+            ok = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            np.maximum.at(layer, y[ok] * width + x[ok], rank[inside][ok])
+    layer[np.isinf(layer)] = np.nan
+    return layer.reshape(height, width)
+
+
+def render(path, pos, sources, targets, values, width=3600, height=2400, mode="log", cmap="viridis"):
+    """
+    Draws every edge and node of the graph into a PNG at path. Edges are a
+    grey density shaded by mode; nodes are sized and coloured by their rank
+    in values, for example PageRank or in-degree, so heavy tails stay legible.
+    """
+    pos = np.asarray(pos, dtype=float)
+    values = np.asarray(values, dtype=float)
+    px = to_pixels(pos, width, height)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    edges = shade(edge_density(px, sources, targets, width, height), mode)
+    image = np.ones((height, width, 3), dtype=np.float32)
+    image -= 0.85 * edges[:, :, None].astype(np.float32)
+    del edges
+    # tied values share their average rank, so equal citation counts look alike
+    rank = (rankdata(values, "average") - 1) / max(len(values) - 1, 1)
+    nodes = node_layer(px, rank, width, height)
+    covered = ~np.isnan(nodes)
+    image[covered] = colormaps[cmap](nodes[covered])[:, :3]
+    plt.imsave(path, image)
@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import numpy as np
+from topic_pagerank import TOPICS
+
+# Defaults shaped after the DBLP v10 citation dump
+NUM_FILES = 4
+START_YEAR = 2000
+END_YEAR = 2017
+MEAN_REFERENCES = 10
+# Share of references that pick a recent paper; the others copy an existing
+# reference, which gives the in-degrees a power-law tail
+RECENT_SHARE = 0.5
+# Mean age of the recent picks, as a share of all papers
+RECENCY = 0.1
+# Share of references to papers outside the dump
+EXTERNAL_SHARE = 0.1
+# n_citation counts citations from outside the dump as well
+CITATION_SCALE = 10
+VOCABULARY = 2000
+# Papers generated together; each one cites papers of earlier blocks only
+BLOCKS = 100
+
+
+def _uuids(rng, count):
+    parts = [rng.integers(0, 1 << bits, size=count) for bits in (32, 16, 16, 16, 48)]
+    return [f"{a:08x}-{b:04x}-{c:04x}-{d:04x}-{e:012x}" for a, b, c, d, e in zip(*(p.tolist() for p in parts))]
+
+
+def _vocabulary(rng, size):
+    # pronounceable made-up words, with the usual topics among the fairly common ones
+    consonants, vowels = list("bcdfghklmnprstvz"), list("aeiou")
+    words = set()
+    while len(words) < size:
+        length = int(rng.integers(2, 5))
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    words = sorted(words)
+    rng.shuffle(words)
+    words = [w for w in words if w not in TOPICS][:size - len(TOPICS)]
+    return words[:50] + TOPICS + words[50:]
+
+
+def citation_structure(num_papers, mean_references=MEAN_REFERENCES, recent_share=RECENT_SHARE,
+                       seed=42, blocks=BLOCKS):
+    """
+    References of every paper as a CSR pair (indptr, targets) over paper
+    indices, oldest paper first. Each block of papers cites earlier blocks by
+    a mix of picking recent papers and copying (preferential attachment).
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(mean_references, size=num_papers)
+    block = max(1, -(-num_papers // blocks))
+    counts[:block] = 0
+    indptr = np.zeros(num_papers + 1, dtype=np.int64)
+    targets = np.zeros(int(counts.sum()), dtype=np.int64)
+    filled = 0
+    for lo in range(block, num_papers, block):
+        hi = min(lo + block, num_papers)
+        total = int(counts[lo:hi].sum())
+        # exponentially distributed age, wrapped into the earlier papers
+        picks = lo - 1 - rng.exponential(RECENCY * num_papers, size=total).astype(np.int64) % lo
+        if filled:
+            copy = rng.random(total) >= recent_share
+            picks[copy] = targets[rng.integers(0, filled, size=int(copy.sum()))]
+        # a paper cites another paper at most once
+        source = np.repeat(np.arange(lo, hi), counts[lo:hi])
+        keys = np.unique(source * num_papers + picks)
+        source, picks = keys // num_papers, keys % num_papers
+        counts[lo:hi] = np.bincount(source - lo, minlength=hi - lo)
+        targets[filled:filled + len(picks)] = picks
+        filled += len(picks)
+    indptr[1:] = np.cumsum(counts)
+    return indptr, targets[:filled]
+
+
+def generate(directory, num_papers, num_files=NUM_FILES, seed=42, start_year=START_YEAR, end_year=END_YEAR,
+             mean_references=MEAN_REFERENCES):
+    """
+    Writes num_papers DBLP-like records to dblp-ref-0.json ... in directory,
+    one JSON object per line with id, title, year, n_citation, references,
+    authors and venue. Returns the paths written.
+    """
+    rng = np.random.default_rng(seed)
+    indptr, targets = citation_structure(num_papers, mean_references, seed=seed)
+    ids = _uuids(rng, num_papers)
+    in_degrees = np.bincount(targets, minlength=num_papers)
+    n_citation = in_degrees * CITATION_SCALE + rng.poisson(2, size=num_papers)
+    # publication counts grow over the years
+    years = start_year + np.floor((end_year - start_year + 1) * np.sqrt(np.arange(num_papers) / num_papers))
+    words = _vocabulary(rng, VOCABULARY)
+    # Zipf-like word frequencies
+    word_p = 1.0 / np.arange(1, len(words) + 1)
+    word_p /= word_p.sum()
+    title_lengths = rng.integers(4, 13, size=num_papers)
+    title_words = rng.choice(len(words), size=int(title_lengths.sum()), p=word_p)
+    title_starts = np.r_[0, np.cumsum(title_lengths)]
+    author_counts = rng.integers(1, 6, size=num_papers)
+    authors = rng.zipf(1.5, size=int(author_counts.sum())) % (num_papers // 2 + 1)
+    author_starts = np.r_[0, np.cumsum(author_counts)]
+    venues = rng.zipf(1.3, size=num_papers) % 500
+
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"dblp-ref-{k}.json") for k in range(num_files)]
+    files = [open(path, "w") for path in paths]
+    try:
+        for i in range(num_papers):
+            references = [ids[t] for t in targets[indptr[i]:indptr[i + 1]].tolist()]
+            external = rng.binomial(len(references), EXTERNAL_SHARE) if references else 0
+            references += _uuids(rng, external) if external else []
+            paper = {
+                "authors": [f"Author {a}" for a in authors[author_starts[i]:author_starts[i + 1]].tolist()],
+                "n_citation": int(n_citation[i]),
+                "references": references,
+                "title": " ".join(words[w] for w in title_words[title_starts[i]:title_starts[i + 1]].tolist()).capitalize(),
+                "venue": f"Venue {venues[i]}",
+                "year": int(years[i]),
+                "id": ids[i],
+            }
+            # the dump leaves out empty reference lists
+            if not references:
+                del paper["references"]
+            files[i * num_files // num_papers].write(json.dumps(paper) + "\n")
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else "./synthetic/dblp-ref"
+    num_papers = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    paths = generate(directory, num_papers)
+    print(f"Wrote {num_papers:,} papers to {', '.join(paths)}")
+
+
+if __name__ == "__main__":
+    main()
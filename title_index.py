@@ -0,0 +1,160 @@
+import os
+import re
+import sys
+import time
+import unicodedata
+import numpy as np
+import graph_store
+
+# The index lives in this sub-directory of the graph store
+INDEX_DIR = "title_index"
+_TOKEN = re.compile(r"[a-z0-9]+")
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    """Lower-cased ASCII word tokens of a title (accents stripped)."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _TOKEN.findall(text.lower())
+
+
+def build_index(store):
+    """
+    Builds the inverted index of the store's titles and writes it next to the
+    graph. For every term it keeps the sorted papers containing it and the
+    (paper, position) occurrences used for phrase queries.
+    """
+    occurrences = {}
+    for i in range(store.num_nodes):
+        if not store.title_mask[i]:
+            continue
+        for pos, term in enumerate(tokenize(store.titles[i])):
+            occurrences.setdefault(term, []).append((i, pos))
+    terms = sorted(occurrences)
+    doc_indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    pos_indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    docs, pos_docs, positions = [], [], []
+    for t, term in enumerate(terms):
+        pairs = np.array(occurrences[term], dtype=np.int64)
+        docs.append(np.unique(pairs[:, 0]))
+        pos_docs.append(pairs[:, 0])
+        positions.append(pairs[:, 1])
+        doc_indptr[t + 1] = doc_indptr[t] + len(docs[-1])
+        pos_indptr[t + 1] = pos_indptr[t] + len(pairs)
+    concat = lambda parts, dtype: np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+    path = os.path.join(store.path, INDEX_DIR)
+    os.makedirs(path, exist_ok=True)
+    graph_store.save_strings(path, "terms", terms)
+    np.save(os.path.join(path, "doc_indptr.npy"), doc_indptr)
+    np.save(os.path.join(path, "docs.npy"), concat(docs, np.int32))
+    np.save(os.path.join(path, "pos_indptr.npy"), pos_indptr)
+    np.save(os.path.join(path, "pos_docs.npy"), concat(pos_docs, np.int32))
+    np.save(os.path.join(path, "positions.npy"), concat(positions, np.int32))
+    with open(os.path.join(path, "fingerprint"), "w") as f:
+        f.write(store.fingerprint)
+
+
+def _indexed_fingerprint(path):
+    fingerprint_path = os.path.join(path, "fingerprint")
+    if not os.path.exists(fingerprint_path):
+        return None
+    with open(fingerprint_path) as f:
+        return f.read()
+
+
+class TitleIndex:
+    """
+    Memory-mapped inverted index over titles.
+
+    Query syntax: words and "quoted phrases" separated by spaces must all match
+    (AND, also accepted explicitly); OR separates alternatives, so
+    'graph mining OR "time series"' is (graph AND mining) OR the phrase.
+    Words match whole tokens, so "search" does not match "research".
+    """
+
+    def __init__(self, store):
+        path = os.path.join(store.path, INDEX_DIR)
+        if _indexed_fingerprint(path) != store.fingerprint:
+            print(f"Building title index in {path}")
+            build_index(store)
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        self.store = store
+        self.terms = graph_store.StringTable(path, "terms")
+        self.doc_indptr = load("doc_indptr")
+        self.docs = load("docs")
+        self.pos_indptr = load("pos_indptr")
+        self.pos_docs = load("pos_docs")
+        self.positions = load("positions")
+
+    def term_id(self, term):
+        lo, hi = 0, len(self.terms)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.terms[mid] < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.terms) and self.terms[lo] == term:
+            return lo
+        return None
+
+    def term_docs(self, term):
+        t = self.term_id(term)
+        if t is None:
+            return np.zeros(0, dtype=np.int32)
+        return np.asarray(self.docs[self.doc_indptr[t]:self.doc_indptr[t + 1]])
+
+    def phrase_docs(self, words):
+        if len(words) == 1:
+            return self.term_docs(words[0])
+        # (paper, start position) keys of every term occurrence, shifted back to the phrase start
+        width = np.int64(1 << 20)
+        matches = None
+        for offset, word in enumerate(words):
+            t = self.term_id(word)
+            if t is None:
+                return np.zeros(0, dtype=np.int32)
+            lo, hi = self.pos_indptr[t], self.pos_indptr[t + 1]
+            positions = np.asarray(self.positions[lo:hi], dtype=np.int64)
+            keep = positions >= offset
+            keys = np.asarray(self.pos_docs[lo:hi], dtype=np.int64)[keep] * width + positions[keep] - offset
+            matches = keys if matches is None else np.intersect1d(matches, keys, assume_unique=True)
+            if len(matches) == 0:
+                break
+        return np.unique(matches // width).astype(np.int32)
+
+    def search(self, query):
+        """Sorted dense ids of the papers whose title matches the query."""
+        result = None
+        clause = None
+        for phrase, word in _QUERY_PART.findall(query):
+            if word == "OR":
+                if clause is not None:
+                    result = clause if result is None else np.union1d(result, clause)
+                clause = None
+                continue
+            if word == "AND":
+                continue
+            words = tokenize(phrase if phrase else word)
+            if not words:
+                continue
+            docs = self.phrase_docs(words)
+            clause = docs if clause is None else np.intersect1d(clause, docs, assume_unique=True)
+        if clause is not None:
+            result = clause if result is None else np.union1d(result, clause)
+        return result if result is not None else np.zeros(0, dtype=np.int32)
+
+
+def main():
+    G = graph_store.load_graph(graph_store.STORE_PATH)
+    start = time.time()
+    index = TitleIndex(G.store)
+    print(f"Title index ready in {time.time() - start:.2f}s ({len(index.terms):,} terms)")
+    for query in sys.argv[1:]:
+        start = time.time()
+        found = index.search(query)
+        print(f"{query!r}: {len(found):,} papers in {(time.time() - start) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
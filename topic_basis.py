@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import scipy.sparse as sp
+import networkx as nx
+import graph_store
+from pagerank_engine import PageRankEngine, top_k
+from title_index import TitleIndex, tokenize
+from topic_pagerank import DAMPING_FACTOR, TOPICS
+
+# The basis lives in this sub-directory of the graph store
+BASIS_DIR = "topic_basis"
+# Terms must appear in at least this many titles to get a basis vector
+MIN_DF = 5
+# Entries kept per basis vector
+TOP_M = 1000
+# Personalization vectors solved together
+BATCH = 64
+# Tight solver tolerance so truncation dominates the error bound
+TOL = 1.0e-10
+
+
+def build_basis(store, alpha=DAMPING_FACTOR, min_df=MIN_DF, top_m=TOP_M, batch=BATCH, tol=TOL):
+    """
+    Offline stage: topic-sensitive PageRank for every title term with at least
+    min_df papers, truncated to its top_m entries and written next to the graph.
+
+    PageRank with personalization p is x = pR / |pR| for R = (I - alpha P)^-1
+    under the networkx dangling convention, so any mix of term vectors can be
+    recombined exactly once each vector's scale |p R| is known. For every term
+    we also keep the L1 mass lost by truncation plus the solver tolerance.
+    """
+    index = TitleIndex(store)
+    engine = PageRankEngine(store)
+    n = store.num_nodes
+    df = np.diff(np.asarray(index.doc_indptr))
+    term_ids = np.flatnonzero(df >= min_df)
+    terms = [index.terms[t] for t in term_ids]
+    top_m = min(top_m, n)
+    # L1 distance to the exact solution once the step change drops below n * tol
+    solver_error = n * tol * alpha / (1 - alpha)
+    indices = np.zeros((len(terms), top_m), dtype=np.int32)
+    data = np.zeros((len(terms), top_m), dtype=np.float32)
+    scale = np.zeros(len(terms))
+    error = np.zeros(len(terms))
+    for lo in range(0, len(terms), batch):
+        cols = term_ids[lo:lo + batch]
+        personalization = np.zeros((n, len(cols)))
+        for j, t in enumerate(cols):
+            personalization[index.docs[index.doc_indptr[t]:index.doc_indptr[t + 1]], j] = 1
+        X = engine.pagerank(alpha=alpha, personalization=personalization, tol=tol, max_iter=10000)
+        for j in range(len(cols)):
+            x = X[:, j]
+            best = top_k(x, top_m)
+            indices[lo + j] = best
+            data[lo + j] = x[best]
+            scale[lo + j] = 1 / (1 - alpha + alpha * x[engine.dangling].sum())
+            error[lo + j] = max(0.0, 1 - data[lo + j].astype(float).sum()) + solver_error
+        print(f"Basis vectors computed: {min(lo + batch, len(terms)):,}/{len(terms):,}")
+    path = os.path.join(store.path, BASIS_DIR)
+    os.makedirs(path, exist_ok=True)
+    graph_store.save_strings(path, "terms", terms)
+    np.save(os.path.join(path, "indices.npy"), indices)
+    np.save(os.path.join(path, "data.npy"), data)
+    np.save(os.path.join(path, "scale.npy"), scale)
+    np.save(os.path.join(path, "error.npy"), error)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"alpha": alpha, "top_m": top_m, "min_df": min_df, "tol": tol,
+                   "fingerprint": store.fingerprint}, f)
+
+
+class TopicBasis:
+    """
+    Query-time topic-sensitive PageRank from the precomputed term vectors.
+    A query is a weighted mix of terms; the answer is the matching mix of the
+    truncated basis vectors, in time proportional to the entries combined.
+    """
+
+    def __init__(self, store):
+        path = os.path.join(store.path, BASIS_DIR)
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["fingerprint"] != store.fingerprint:
+            raise ValueError(f"Topic basis in '{path}' was built for another graph")
+        self.store = store
+        self.alpha = self.meta["alpha"]
+        terms = graph_store.StringTable(path, "terms")
+        self.term_ids = {terms[t]: t for t in range(len(terms))}
+        self.indices = np.load(os.path.join(path, "indices.npy"), mmap_mode="r")
+        self.data = np.load(os.path.join(path, "data.npy"), mmap_mode="r")
+        self.scale = np.load(os.path.join(path, "scale.npy"))
+        self.error = np.load(os.path.join(path, "error.npy"))
+
+    def weights(self, query):
+        """Term weights of a query: a {term: weight} dict, or text with equal weights."""
+        if isinstance(query, str):
+            query = {term: 1.0 for term in tokenize(query)}
+        missing = [term for term in query if term not in self.term_ids]
+        if missing:
+            raise KeyError(f"No basis vector for {', '.join(missing)}")
+        return {self.term_ids[term]: float(w) for term, w in query.items() if w > 0}
+
+    def query(self, query, k=10):
+        """
+        Returns (top-k [(paper id, score), ...], L1 error bound against exact
+        topic-sensitive PageRank for the same mix of term personalizations).
+        """
+        weights = self.weights(query)
+        if not weights:
+            raise ValueError("Empty query")
+        rows = np.array(list(weights))
+        # mixing weights of the normalized vectors, see build_basis
+        mix = np.array(list(weights.values())) * self.scale[rows]
+        mix /= mix.sum()
+        combined = sp.csr_matrix(
+            (np.asarray(self.data[rows], dtype=float).ravel() * np.repeat(mix, self.data.shape[1]),
+             np.asarray(self.indices[rows]).ravel(), np.arange(len(rows) + 1) * self.data.shape[1]),
+            shape=(len(rows), self.store.num_nodes)).sum(axis=0).A1
+        nodes = np.flatnonzero(combined)
+        best = nodes[top_k(combined[nodes], k)]
+        bound = float(mix @ self.error[rows])
+        return [(self.store.node_id(i), combined[i]) for i in best], bound
+
+    def personalization(self, query):
+        """Exact personalization vector the query stands for, for checking."""
+        weights = self.weights(query)
+        index = TitleIndex(self.store)
+        p = np.zeros(self.store.num_nodes)
+        terms = {t: term for term, t in self.term_ids.items()}
+        for t, w in weights.items():
+            docs = index.term_docs(terms[t])
+            p[docs] += w / len(docs)
+        return p
+
+
+def report_error(G, basis, queries, k=10):
+    """Compares basis answers with nx.pagerank: the bound, the measured L1 error and top-k overlap."""
+    nx_graph = G.to_networkx()
+    nodes = list(nx_graph.nodes())
+    for query in queries:
+        start = time.time()
+        ranked, bound = basis.query(query, k=basis.store.num_nodes)
+        elapsed = time.time() - start
+        p = basis.personalization(query)
+        exact = nx.pagerank(nx_graph, alpha=basis.alpha, personalization=dict(zip(nodes, p)), tol=1.0e-10)
+        approx = dict(ranked)
+        l1 = sum(abs(exact[n] - approx.get(n, 0.0)) for n in nodes)
+        exact_top = {n for n, _ in sorted(exact.items(), key=lambda x: x[1], reverse=True)[:k]}
+        overlap = len(exact_top & {n for n, _ in ranked[:k]})
+        print(f"{str(query):<30} bound={bound:.2e} L1 vs nx.pagerank={l1:.2e} "
+              f"top-{k} overlap={overlap}/{k} query time={elapsed * 1000:.2f} ms")
+
+
+def main():
+    G = graph_store.load_graph(graph_store.STORE_PATH)
+    store = G.store
+    if not os.path.exists(os.path.join(store.path, BASIS_DIR, "meta.json")):
+        build_basis(store)
+    basis = TopicBasis(store)
+    queries = sys.argv[1:] or [topic for topic in TOPICS if topic in basis.term_ids]
+    report_error(G, basis, queries)
+
+
+if __name__ == "__main__":
+    main()
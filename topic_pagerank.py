@@ -1,44 +1,69 @@
-import networkx as nx
-import pickle
+import sys
+import numpy as np
+import graph_store
+from pagerank_engine import PageRankEngine, top_k
+from title_index import TitleIndex
 
 TOPICS = ["security", "hashing", "streaming", "timeseries", "search"]
 DAMPING_FACTOR = 0.85
 
-def load_graph(path="dblp_filtered_graph.gpickle"):
-    with open(path, "rb") as f:
-        G = pickle.load(f)
+def load_graph(path=graph_store.STORE_PATH):
+    G = graph_store.load_graph(path)
     print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges.")
     return G
 
-def compute_topic_sensitive_pagerank(G, topic):
-    topic = topic.lower()
-    topic_nodes = [n for n, data in G.nodes(data=True)
-                   if data.get("title") and topic in data["title"].lower()]
-    
-    if not topic_nodes:
-        print(f"No papers found for topic '{topic}'.")
-        return None
-
-    personalization = {n: 0 for n in G.nodes()}
-    for n in topic_nodes:
-        personalization[n] = 1 / len(topic_nodes)
-
-    pr_scores = nx.pagerank(G, alpha=DAMPING_FACTOR, personalization=personalization)
-    ranked = sorted(pr_scores.items(), key=lambda x: x[1], reverse=True)[:10]
-
-    print(f"\nTop 10 papers for topic '{topic}':")
-    print(f"{'Rank':<4} {'Title':<70} {'PageRank':<10} {'Citations'}")
-    print("-" * 100)
-    for i, (pid, score) in enumerate(ranked, 1):
-        title = G.nodes[pid].get("title", "No Title")
-        citations = G.in_degree(pid)
-        print(f"{i:<4} {title[:68]:<70} {score:<10.6f} {citations}")
-    return ranked
+def topic_seed_nodes(index, topic):
+    # topics are title index queries: words, "phrases", AND / OR
+    return index.search(topic)
+
+def compute_topic_sensitive_pagerank(G, topics, engine=None, index=None, k=10):
+    """
+    Topic-sensitive PageRank for every topic in one batched solve.
+    Returns {topic: [(paper id, score), ...]} with the top-k papers per topic.
+    """
+    if isinstance(topics, str):
+        topics = [topics]
+    store = G.store
+    if index is None:
+        index = TitleIndex(store)
+    seeds = {}
+    for topic in topics:
+        topic_nodes = topic_seed_nodes(index, topic)
+        if len(topic_nodes) == 0:
+            print(f"No papers found for topic '{topic}'.")
+            continue
+        seeds[topic] = topic_nodes
+    if not seeds:
+        return {}
+
+    # one personalization column per topic, uniform over its seed papers
+    personalization = np.zeros((store.num_nodes, len(seeds)))
+    for col, topic_nodes in enumerate(seeds.values()):
+        personalization[topic_nodes, col] = 1 / len(topic_nodes)
+
+    if engine is None:
+        engine = PageRankEngine(store)
+    pr_scores = engine.pagerank(alpha=DAMPING_FACTOR, personalization=personalization)
+    in_degrees = store.in_degrees()
+
+    results = {}
+    for col, topic in enumerate(seeds):
+        scores = pr_scores[:, col]
+        ranked = [(i, scores[i]) for i in top_k(scores, k)]
+        print(f"\nTop {k} papers for topic '{topic}':")
+        print(f"{'Rank':<4} {'Title':<70} {'PageRank':<10} {'Citations'}")
+        print("-" * 100)
+        for rank, (i, score) in enumerate(ranked, 1):
+            title = store.title(i) or "No Title"
+            citations = in_degrees[i]
+            print(f"{rank:<4} {title[:68]:<70} {score:<10.6f} {citations}")
+        results[topic] = [(store.node_id(i), score) for i, score in ranked]
+    return results
 
 def main():
     G = load_graph()
-    for topic in TOPICS:
-        compute_topic_sensitive_pagerank(G, topic)
+    # topics can be given as queries on the command line
+    compute_topic_sensitive_pagerank(G, sys.argv[1:] or TOPICS)
 
 if __name__ == "__main__":
     main()
@@ -1,46 +1,70 @@
 import os
 import time
 import pickle
+import numpy as np
 import networkx as nx
+import graph_store
+import layout
+import instrumentation
+import raster
+from pagerank_engine import PageRankEngine
 import matplotlib.pyplot as plt
 
-GPICKLE = "dblp_filtered_graph.gpickle"
+GRAPH_STORE = graph_store.STORE_PATH
 POS_CACHE = "graph_pos.pickle"
 OUT = "graph.png"
+# Graphs above this size are rasterized instead of drawn artist by artist
+RASTER_NODES = 5000
+# Node colour and size: "pagerank" or "in_degree"
+COLOR_BY = "pagerank"
+# Largest share of new nodes placed into a cached layout; beyond it the
+# layout is recomputed, as placement only averages neighbour positions
+MAX_NEW_SHARE = 0.1
 
 def load_graph(path):
-    with open(path, "rb") as f:
-        return pickle.load(f)
+    return graph_store.load_graph(path)
 
 def load_or_compute_pos(G, cache=POS_CACHE):
     # Try to reuse previously-computed layout to save time
+    cached = {}
     if os.path.exists(cache):
         try:
             with open(cache, "rb") as f:
-                pos = pickle.load(f)
-            # ensure cached positions match nodes
-            if set(pos.keys()) == set(G.nodes()):
-                print("Loaded cached positions from", cache)
-                return pos
-            else:
-                print("Cached positions node-set mismatch; recomputing layout")
+                cached = pickle.load(f)
         except Exception:
             print("Failed to load position cache; recomputing layout")
 
-    n = G.number_of_nodes()
-    print(f"Computing layout for {n} nodes...")
+    store = G.store
+    nodes = list(G.nodes())
+    n = len(nodes)
+    placed = np.array([node in cached for node in nodes], dtype=bool)
+    new = n - int(placed.sum())
+    if placed.all() and len(cached) == n:
+        print("Loaded cached positions from", cache)
+        return cached
+
+    sources = store.edge_sources()
+    targets = np.asarray(store.indices)
     start = time.time()
-    # Heuristics: avoid expensive layout for very large graphs
-    if n > 3000:
-        # fast but random-looking layout for huge graphs
-        pos = nx.random_layout(G, seed=42)
-    elif n > 500:
-        # medium-sized: faster spring layout
-        pos = nx.spring_layout(G, seed=42, iterations=50)
-    else:
-        # small graphs: more refined layout
-        pos = nx.spring_layout(G, seed=42, iterations=200)
+    with instrumentation.span("layout", nodes=n, cached=int(placed.sum())):
+        if placed.any() and new <= MAX_NEW_SHARE * n:
+            # keep the cached positions, drop stale ones and place only the new nodes
+            print(f"Placing {new} new nodes into the cached layout...")
+            pos = np.zeros((n, 2))
+            pos[placed] = [cached[node] for node, p in zip(nodes, placed) if p]
+            pos = layout.place_new_nodes(pos, placed, sources, targets)
+        elif n > 500:
+            if placed.any():
+                print(f"{new} of {n} nodes are not in the cached layout")
+            print(f"Computing layout for {n} nodes...")
+            pos = layout.multilevel_layout(n, sources, targets)
+        else:
+            # small graphs: more refined layout
+            print(f"Computing layout for {n} nodes...")
+            spring = nx.spring_layout(G.to_networkx(), seed=42, iterations=200)
+            pos = np.array([spring[node] for node in nodes]).reshape(n, 2)
     print(f"Layout computed in {time.time()-start:.2f}s")
+    pos = dict(zip(nodes, pos))
 
     # Cache positions for future runs (best-effort)
     try:
@@ -51,25 +75,38 @@ def load_or_compute_pos(G, cache=POS_CACHE):
 
     return pos
 
+def node_values(G, by=COLOR_BY):
+    """PageRank or in-degree of every node, in node order."""
+    if by == "pagerank":
+        return PageRankEngine(G.store).pagerank()
+    if by == "in_degree":
+        return G.store.in_degrees()
+    raise ValueError(f"Unknown node colouring '{by}'")
+
 def main():
-    G = load_graph(GPICKLE)
+    G = load_graph(GRAPH_STORE)
     print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
-
     pos = load_or_compute_pos(G)
-
-    plt.figure(figsize=(12, 8))
     n = G.number_of_nodes()
 
-    # For very large graphs, draw a sampled subgraph to keep things fast and readable
-    if n > 5000:
-        nodes = list(G.nodes())[:2000]
-        subG = G.subgraph(nodes)
-        nx.draw_networkx_nodes(subG, pos, node_color="skyblue", node_size=50, alpha=0.8)
-        nx.draw_networkx_edges(subG, pos, alpha=0.2, width=0.2)
-    else:
-        node_size = 800 if n <= 200 else 50
-        nx.draw_networkx_nodes(G, pos, node_color="skyblue", node_size=node_size)
-        nx.draw_networkx_edges(G, pos, alpha=0.3, width=0.5)
+    # For very large graphs, rasterize every node and edge straight into the PNG
+    if n > RASTER_NODES:
+        start = time.time()
+        store = G.store
+        xy = np.array([pos[node] for node in G.nodes()])
+        with instrumentation.span("render", nodes=n, edges=G.number_of_edges()):
+            raster.render(OUT, xy, store.edge_sources(), store.indices, node_values(G),
+                          width=12 * 300, height=8 * 300)
+        print(f"Rendered {n} nodes in {time.time()-start:.2f}s")
+        print("Saved", OUT)
+        return
+
+    # drawing still goes through networkx
+    G = G.to_networkx()
+    plt.figure(figsize=(12, 8))
+    node_size = 800 if n <= 200 else 50
+    nx.draw_networkx_nodes(G, pos, node_color="skyblue", node_size=node_size)
+    nx.draw_networkx_edges(G, pos, alpha=0.3, width=0.5)
 
     # Only draw labels for small graphs (labels are expensive and cluttered)
     if n <= 200: